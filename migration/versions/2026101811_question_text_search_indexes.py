@@ -0,0 +1,40 @@
+"""question text search indexes
+
+Revision ID: a5e5a30561f1
+Revises: af4e29f1743d
+Create Date: 2026-10-18 11:02:47.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5e5a30561f1'
+down_revision: Union[str, None] = 'af4e29f1743d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_question_text_trgm', 'question', ['text'], unique=False,
+        postgresql_using='gin', postgresql_ops={'text': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_question_text_fts', 'question',
+        [sa.text("to_tsvector('simple'::regconfig, coalesce(text, ''))")],
+        unique=False, postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_question_text_fts', table_name='question')
+    op.drop_index('ix_question_text_trgm', table_name='question')
@@ -0,0 +1,45 @@
+"""game query indexes
+
+Revision ID: 6b35b724752b
+Revises: a5e5a30561f1
+Create Date: 2026-10-18 12:20:05.733910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b35b724752b'
+down_revision: Union[str, None] = 'a5e5a30561f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# question(active, id) and question(active, updated_dt, id) are in af4e29f1743d
+indexes = [
+    ('ix_round_player_id_asked', 'round', ['player_id', 'asked']),
+    ('ix_round_player_id_question_id', 'round', ['player_id', 'question_id']),
+    ('ix_answer_question_id_correct', 'answer', ['question_id', 'correct']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY doesn't block writes on a live db,
+    # but can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in indexes:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(indexes):
+            op.drop_index(
+                name, table_name=table, if_exists=True,
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,35 @@
+"""player score index
+
+Revision ID: 3c9d0e7a2b41
+Revises: 6b35b724752b
+Create Date: 2026-10-18 13:05:41.218904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d0e7a2b41'
+down_revision: Union[str, None] = '6b35b724752b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # leaderboard: ORDER BY score DESC, id LIMIT n
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_player_score_id', 'player', [sa.text('score DESC'), 'id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_player_score_id', table_name='player', if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,52 @@
+"""round unique player question
+
+Revision ID: 8e21f4c6d0a7
+Revises: 3c9d0e7a2b41
+Create Date: 2026-10-18 14:10:27.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e21f4c6d0a7'
+down_revision: Union[str, None] = '3c9d0e7a2b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keep the first round of every (player, question), the derived
+    # table lets mysql select from the table it deletes from
+    op.execute(sa.text(
+        "DELETE FROM round WHERE id NOT IN ("
+        "SELECT id FROM (SELECT min(id) AS id FROM round "
+        "GROUP BY player_id, question_id) AS keep)"
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_round_player_id_question_id', 'round',
+            ['player_id', 'question_id'], unique=True, if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        # the unique index serves the same lookups
+        op.drop_index(
+            'ix_round_player_id_question_id', table_name='round',
+            if_exists=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_round_player_id_question_id', 'round',
+            ['player_id', 'question_id'], unique=False, if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'uq_round_player_id_question_id', table_name='round',
+            if_exists=True, postgresql_concurrently=True,
+        )
@@ -0,0 +1,32 @@
+"""question stats
+
+Revision ID: 5f3a9c1e7b20
+Revises: 8e21f4c6d0a7
+Create Date: 2026-10-18 15:02:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3a9c1e7b20'
+down_revision: Union[str, None] = '8e21f4c6d0a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('question_stats',
+    sa.Column('question_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('attempts', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('correct', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('last_answered_dt', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('question_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('question_stats')
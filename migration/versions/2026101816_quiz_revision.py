@@ -0,0 +1,33 @@
+"""quiz revision
+
+Revision ID: 2d7b6e0f4c93
+Revises: 5f3a9c1e7b20
+Create Date: 2026-10-18 16:20:05.441902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7b6e0f4c93'
+down_revision: Union[str, None] = '5f3a9c1e7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('quiz_revision',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(sa.text(
+        "INSERT INTO quiz_revision (id, revision) VALUES (1, 0)"
+    ))
+
+
+def downgrade() -> None:
+    op.drop_table('quiz_revision')
@@ -0,0 +1 @@
+"""Maintenance scripts, run as python -m scripts.<name>."""
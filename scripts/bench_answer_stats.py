@@ -0,0 +1,88 @@
+"""Latency of /v1/submit-answer with answer stats off and on.
+
+Alternates runs with caches.answer_stats disabled and enabled (its
+flusher upserting every --flush-interval seconds meanwhile) and prints
+p50/p95/p99 of each, so the write-behind cost shows up as a difference:
+
+    python -m scripts.bench_answer_stats --questions 1000 --runs 3
+    python -m scripts.bench_answer_stats --db-url sqlite+aiosqlite:///s.db \
+        --create-tables --questions 1000 --requests 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from scripts.bench_endpoints import endpoints, load_dataset, run_endpoint, seed
+from service.__main__ import app  # noqa: PLC2701
+from service.caches import answer_stats
+from service.db_setup.db_settings import db_manager
+from service.utils import save_answer_stats
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.db_url:
+        db_manager.url = args.db_url
+    db_manager.get_engine()
+    if args.create_tables:
+        await db_manager.create_tables()
+    if args.questions:
+        await seed(args)
+    dataset = await load_dataset()
+    if not (dataset.question_ids and dataset.answer_ids):
+        raise SystemExit("empty dataset: seed questions first")
+    (submit,) = (e for e in endpoints() if e.name == "POST /v1/submit-answer")
+
+    answer_stats.interval = args.flush_interval
+    answer_stats.start(save_answer_stats)
+    results = {False: [], True: []}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://stats"
+    ) as client:
+        # warm up the correct answers cache for both modes alike
+        await run_endpoint(client, submit, dataset, args)
+        for _ in range(args.runs):
+            for enabled in (False, True):
+                answer_stats.enabled = enabled
+                results[enabled].append(
+                    await run_endpoint(client, submit, dataset, args)
+                )
+    pending = len(answer_stats)
+    started = time.perf_counter()
+    await answer_stats.stop(save_answer_stats)
+    flush_ms = (time.perf_counter() - started) * 1000
+    await db_manager.dispose()
+
+    for enabled, runs in results.items():
+        print(  # noqa: T201
+            f"stats {'on ' if enabled else 'off'}"
+            f"  {statistics.median(r['rps'] for r in runs):>8} rps"
+            + "".join(
+                f"  {p} {statistics.median(r[f'{p}_ms'] for r in runs)} ms"
+                for p in ("p50", "p95", "p99")
+            )
+        )
+    print(f"last flush: {pending} questions in {flush_ms:.1f} ms")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="instead of DB_* settings")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument("--questions", type=int, default=0, help="to seed")
+    parser.add_argument("--answers", type=int, default=4, help="per question")
+    parser.add_argument("--requests", type=int, default=1000, help="per run")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=3, help="per mode")
+    parser.add_argument("--flush-interval", type=float, default=1)
+    args = parser.parse_args()
+    args.players, args.rounds = 0, 0
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""Throughput and p50/p95/p99 latency of every endpoint.
+
+Seeds a synthetic dataset (questions, answers, players, rounds), then
+drives the routers of service/endpoints through an in-process ASGI
+client and writes the results as json, to diff between commits:
+
+    python -m scripts.bench_endpoints --questions 10000 --players 1000
+    python -m scripts.bench_endpoints --requests 2000 --out bench/b.json
+
+--db-url with --create-tables runs it on a separate database.
+
+Admission limits are off unless ADMISSION_* is set in the environment:
+the bench concurrency would get fast 429s instead of timings. Latency
+and rps only count 2xx responses; the others are `errors`, by status
+in `statuses`.
+"""
+
+import os
+
+os.environ.setdefault("ADMISSION_PER_PLAYER", "0")
+os.environ.setdefault("ADMISSION_MAX_IN_FLIGHT", "0")
+os.environ.setdefault("ADMISSION_MAX_POOL_WAITERS", "0")
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+import sqlalchemy as sa
+
+from service.__main__ import app  # noqa: PLC2701
+from service.db_setup.db_settings import db_manager
+from service.db_setup.models import Answer, Player, Question, Rounds
+from service.db_watchers import QuestionDb
+from service.schemas import QuestionImportItem
+
+SEED_BATCH = 1000
+
+
+@dataclass
+class Dataset:
+    question_ids: list[int]
+    answer_ids: list[int]
+    tg_ids: list[int]
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    # dataset -> kwargs of httpx request (url, params, json)
+    request: Callable[[Dataset], dict]
+
+
+def endpoints() -> list[Endpoint]:
+    def q(d):
+        return random.choice(d.question_ids)
+
+    def a(d):
+        return random.choice(d.answer_ids)
+
+    def tg(d):
+        return random.choice(d.tg_ids)
+
+    return [
+        Endpoint("GET /v1/quiz", "GET", lambda d: {"url": "/v1/quiz"}),
+        Endpoint(
+            "GET /v1/questions", "GET", lambda d: {"url": "/v1/questions"}
+        ),
+        Endpoint(
+            "POST /v1/questions/batch",
+            "POST",
+            lambda d: {
+                "url": "/v1/questions/batch",
+                "json": {"ids": [q(d) for _ in range(5)]},
+            },
+        ),
+        Endpoint(
+            "GET /v1/answer/{id}",
+            "GET",
+            lambda d: {"url": f"/v1/answer/{a(d)}"},
+        ),
+        Endpoint(
+            "POST /v1/question",
+            "POST",
+            lambda d: {"url": "/v1/question", "json": {"text": "bench"}},
+        ),
+        Endpoint(
+            "POST /v1/answer",
+            "POST",
+            lambda d: {
+                "url": "/v1/answer",
+                "json": {
+                    "text": "bench",
+                    "correct": False,
+                    "question_id": q(d),
+                },
+            },
+        ),
+        Endpoint(
+            "POST /v1/submit-answer",
+            "POST",
+            lambda d: {
+                "url": "/v1/submit-answer",
+                "params": {"question_id": q(d)},
+                "json": [a(d)],
+            },
+        ),
+        Endpoint(
+            "POST /v1/round-question",
+            "POST",
+            lambda d: {"url": "/v1/round-question", "json": {"tg_id": tg(d)}},
+        ),
+        Endpoint(
+            "POST /v1/round-question-id",
+            "POST",
+            lambda d: {
+                "url": "/v1/round-question-id",
+                "json": {"tg_id": tg(d)},
+            },
+        ),
+        Endpoint(
+            "POST /v1/turn",
+            "POST",
+            lambda d: {
+                "url": "/v1/turn",
+                "json": {
+                    "tg_id": tg(d),
+                    "question_id": q(d),
+                    "answer_ids": [a(d)],
+                },
+            },
+        ),
+        Endpoint(
+            "PUT /v1/mark-answered",
+            "PUT",
+            lambda d: {
+                "url": "/v1/mark-answered",
+                "json": {"tg_id": tg(d), "question_id": q(d)},
+            },
+        ),
+        Endpoint(
+            "PUT /v1/edit-score",
+            "PUT",
+            lambda d: {"url": "/v1/edit-score", "params": {"tg_id": tg(d)}},
+        ),
+        Endpoint(
+            "PUT /v1/edit-scores",
+            "PUT",
+            lambda d: {
+                "url": "/v1/edit-scores",
+                "json": {"items": [{"tg_id": tg(d)} for _ in range(10)]},
+            },
+        ),
+        Endpoint(
+            "GET /v1/player-score",
+            "GET",
+            lambda d: {"url": "/v1/player-score", "params": {"tg_id": tg(d)}},
+        ),
+        Endpoint(
+            "PUT /tg-update-id",
+            "PUT",
+            lambda d: {
+                "url": "/tg-update-id",
+                "json": {"update_id": random.randint(1, 10**6)},
+            },
+        ),
+        Endpoint(
+            "GET /tg-update-id", "GET", lambda d: {"url": "/tg-update-id"}
+        ),
+    ]
+
+
+async def seed(args: argparse.Namespace) -> None:
+    """Questions with answers, players and their unasked rounds."""
+    first_tg_id = random.randint(10**9, 2 * 10**9)
+    async with db_manager.session_maker() as session:
+        for start in range(0, args.questions, SEED_BATCH):
+            items = [
+                QuestionImportItem(
+                    text=f"bench question {start + i}",
+                    answers=[
+                        {"text": f"answer {n}", "correct": n == 0}
+                        for n in range(args.answers)
+                    ],
+                )
+                for i in range(min(SEED_BATCH, args.questions - start))
+            ]
+            await QuestionDb(session).add_questions_with_answers(items)
+        tg_ids = range(first_tg_id, first_tg_id + args.players)
+        if tg_ids:
+            await session.execute(
+                sa.insert(Player), [{"tg_id": tg_id} for tg_id in tg_ids]
+            )
+        question_ids = (
+            (await session.execute(sa.select(Question.id))).scalars().all()
+        )
+        if question_ids and args.rounds:
+            await session.execute(
+                sa.insert(Rounds),
+                [
+                    {"player_id": tg_id, "question_id": question_id}
+                    for tg_id in tg_ids
+                    for question_id in random.sample(
+                        question_ids, min(args.rounds, len(question_ids))
+                    )
+                ],
+            )
+        await session.commit()
+
+
+async def load_dataset() -> Dataset:
+    async with db_manager.session_maker() as session:
+
+        async def ids(column):
+            return (await session.execute(sa.select(column))).scalars().all()
+
+        return Dataset(
+            question_ids=await ids(Question.id),
+            answer_ids=await ids(Answer.id),
+            tg_ids=await ids(Player.tg_id),
+        )
+
+
+async def run_endpoint(
+    client: httpx.AsyncClient, endpoint: Endpoint, dataset: Dataset, args
+) -> dict:
+    latencies, statuses = [], Counter()
+    left = args.requests
+
+    async def worker():
+        nonlocal left
+        while left > 0:
+            left -= 1
+            started = time.perf_counter()
+            response = await client.request(
+                endpoint.method, **endpoint.request(dataset)
+            )
+            elapsed = time.perf_counter() - started
+            if response.is_success:
+                latencies.append(elapsed)
+            else:
+                statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    result = {
+        "requests": args.requests,
+        "errors": sum(statuses.values()),
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": None,
+        "p95_ms": None,
+        "p99_ms": None,
+    }
+    if len(latencies) > 1:
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        result |= {
+            "p50_ms": round(percentiles[49] * 1000, 2),
+            "p95_ms": round(percentiles[94] * 1000, 2),
+            "p99_ms": round(percentiles[98] * 1000, 2),
+        }
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def bench(args: argparse.Namespace) -> dict:
+    if args.db_url:
+        db_manager.url = args.db_url
+    engine = db_manager.get_engine()
+    if args.create_tables:
+        await db_manager.create_tables()
+    if args.questions or args.players:
+        await seed(args)
+    dataset = await load_dataset()
+    if not (dataset.question_ids and dataset.answer_ids and dataset.tg_ids):
+        raise SystemExit("empty dataset: seed questions and players first")
+
+    results = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for endpoint in endpoints():
+            if args.only and args.only not in endpoint.name:
+                continue
+            results[endpoint.name] = await run_endpoint(
+                client, endpoint, dataset, args
+            )
+    await db_manager.dispose()
+    return {
+        "commit": git_commit(),
+        "dialect": engine.dialect.name,
+        "dataset": {
+            "questions": len(dataset.question_ids),
+            "answers": len(dataset.answer_ids),
+            "players": len(dataset.tg_ids),
+        },
+        "concurrency": args.concurrency,
+        "endpoints": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="instead of DB_* settings")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument("--questions", type=int, default=0, help="to seed")
+    parser.add_argument("--answers", type=int, default=4, help="per question")
+    parser.add_argument("--players", type=int, default=0, help="to seed")
+    parser.add_argument("--rounds", type=int, default=5, help="per player")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--only", help="substring of endpoint names to run")
+    parser.add_argument("--out", type=Path, default=Path("bench/latest.json"))
+    args = parser.parse_args()
+
+    report = asyncio.run(bench(args))
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+    for name, result in report["endpoints"].items():
+        print(  # noqa: T201
+            f"{name:28} {result['rps']:>8} rps  p50 {result['p50_ms']} ms"
+            f"  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms"
+            f"  errors {result['errors']} {result['statuses'] or ''}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Work saved by ETags when /v1/quiz and /v1/questions are polled.
+
+Polls every listing --polls times the way a bot without caching does,
+then with If-None-Match set to the ETag of the first answer, and prints
+statements, response bytes, cpu time and latency per poll for both:
+
+    python -m scripts.bench_etag --questions 1000 --limit 500
+    python -m scripts.bench_etag --db-url sqlite+aiosqlite:///e.db \
+        --create-tables --questions 1000
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import event
+
+from scripts.bench_endpoints import seed
+from service.__main__ import app  # noqa: PLC2701
+from service.db_setup.db_settings import db_manager
+
+
+async def poll(
+    client: httpx.AsyncClient, url: str, polls: int, headers: dict
+) -> dict:
+    statements = 0
+
+    def count(*args) -> None:
+        nonlocal statements
+        statements += 1
+
+    engine = db_manager.get_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", count)
+    size, statuses = 0, set()
+    cpu_started, started = time.process_time(), time.perf_counter()
+    try:
+        for _ in range(polls):
+            response = await client.get(url, headers=headers)
+            size += len(response.content)
+            statuses.add(response.status_code)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return {
+        "status": sorted(statuses),
+        "statements": statements / polls,
+        "bytes": size / polls,
+        "cpu_ms": (time.process_time() - cpu_started) * 1000 / polls,
+        "ms": (time.perf_counter() - started) * 1000 / polls,
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.db_url:
+        db_manager.url = args.db_url
+    db_manager.get_engine()
+    if args.create_tables:
+        await db_manager.create_tables()
+    if args.questions:
+        await seed(args)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://etag"
+    ) as client:
+        for path in ("/v1/quiz", "/v1/questions"):
+            url = f"{path}?limit={args.limit}"
+            etag = (await client.get(url)).headers.get("etag")
+            if etag is None:
+                raise SystemExit(f"{path} sent no ETag")
+            for name, headers in (
+                ("full", {}),
+                ("if-none-match", {"If-None-Match": etag}),
+            ):
+                result = await poll(client, url, args.polls, headers)
+                print(  # noqa: T201
+                    f"{path:14} {name:14} status {result['status']}"
+                    f"  statements {result['statements']:5.2f}"
+                    f"  bytes {result['bytes']:9.0f}"
+                    f"  cpu {result['cpu_ms']:7.2f} ms"
+                    f"  {result['ms']:7.2f} ms per poll"
+                )
+    await db_manager.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="instead of DB_* settings")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument("--questions", type=int, default=0, help="to seed")
+    parser.add_argument("--answers", type=int, default=4, help="per question")
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+    args.players, args.rounds = 0, 0
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Requests per second with an engine per request against the shared
+application pool.
+
+`per_request` is what get_session did before the lifespan engine: a new
+engine (pool_size=1) for every request, its connection opened, the
+request's query run and the engine disposed. `pool` takes a session of
+db_manager's engine, which keeps its connections open. Both run the
+query of GET /v1/player-score from --concurrency tasks for --seconds
+and report requests per second and latency percentiles as json:
+
+    python -m scripts.bench_pool --concurrency 1 10 50
+    python -m scripts.bench_pool --db-url postgresql+asyncpg://... \
+        --create-tables --seconds 10
+
+The gap is the connection handshake (TCP and auth on postgres, opening
+the file on sqlite), so it is far wider over a network.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from service.db_setup.db_settings import db_manager
+from service.db_watchers import GameDb
+
+TG_ID = 1
+
+
+async def per_request() -> None:
+    engine = db_manager.create_engine(db_manager.uri, primary=False)
+    try:
+        async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+            await GameDb(session).get_score_of_player(TG_ID)
+    finally:
+        await engine.dispose()
+
+
+async def pooled() -> None:
+    async with db_manager.session_maker() as session:
+        await GameDb(session).get_score_of_player(TG_ID)
+
+
+MODES: dict[str, Callable[[], Awaitable[None]]] = {
+    "per_request": per_request,
+    "pool": pooled,
+}
+
+
+async def load(
+    request: Callable[[], Awaitable[None]], seconds: float, concurrency: int
+) -> dict:
+    timings: list[float] = []
+    deadline = time.monotonic() + seconds
+
+    async def worker() -> None:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            await request()
+            timings.append(time.perf_counter() - started)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p95_ms": round(percentiles[94] * 1000, 2),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.db_url:
+        db_manager.url = args.db_url
+    engine = db_manager.get_engine()
+    if args.create_tables:
+        await db_manager.create_tables()
+    async with db_manager.session_maker() as session:
+        await GameDb(session).create_player(TG_ID)
+        await session.commit()
+    results = []
+    for concurrency in args.concurrency:
+        result = {"concurrency": concurrency}
+        for mode, request in MODES.items():
+            result[mode] = await load(request, args.seconds, concurrency)
+        results.append(result)
+        print(  # noqa: T201
+            f"{concurrency:>4} tasks"
+            + "".join(
+                f"  {mode} {result[mode]['requests_per_second']:9.1f} rps"
+                f" p50 {result[mode]['p50_ms']:7.2f} ms"
+                for mode in MODES
+            )
+        )
+    await db_manager.dispose()
+    return {"dialect": engine.dialect.name, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="instead of DB_* settings")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 10, 50]
+    )
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--out", type=Path, default=Path("bench/pool.json"))
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Latency of picking round questions: ORDER BY random() against the
+cached pool of active ids, as the question table grows.
+
+Grows the question table to every --sizes step (one row in ten
+inactive), then times GameDb.create_new_rounds in both ROUND_SAMPLING
+modes for --samples players, each in a rolled back transaction, and
+writes p50/p95 per size and mode as json:
+
+    python -m scripts.bench_sampling --sizes 1000 10000 100000 1000000
+    python -m scripts.bench_sampling --db-url sqlite+aiosqlite:///s.db \
+        --create-tables --sizes 1000 100000
+
+`reload_ms` is the id pool load, waited for by the first request only;
+later reloads, once per QUESTION_IDS_TTL, run in the background.
+`inactive` counts picked questions that are not active and must stay 0.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from service.caches import active_question_ids
+from service.db_setup.db_settings import db_manager
+from service.db_setup.models import Player, Question, Rounds
+from service.db_watchers import GameDb, QuestionDb
+
+MODES = ("random_sort", "id_pool")
+SEED_BATCH = 10_000
+
+
+async def grow(size: int) -> None:
+    """Insert questions until the table has `size` rows."""
+    async with db_manager.session_maker() as session:
+        count = await session.scalar(sa.select(sa.func.count(Question.id)))
+        for start in range(count, size, SEED_BATCH):
+            await session.execute(
+                sa.insert(Question),
+                [
+                    {"text": f"bench question {n}", "active": int(n % 10 != 0)}
+                    for n in range(start, min(start + SEED_BATCH, size))
+                ],
+            )
+        await session.commit()
+
+
+async def add_players(amount: int) -> list[int]:
+    first = random.randint(10**9, 2 * 10**9)
+    tg_ids = list(range(first, first + amount))
+    async with db_manager.session_maker() as session:
+        await session.execute(
+            sa.insert(Player), [{"tg_id": tg_id} for tg_id in tg_ids]
+        )
+        await session.commit()
+    return tg_ids
+
+
+async def pick(tg_id: int, mode: str) -> tuple[float, int]:
+    """Seconds of one refill of 5 rounds, and inactive questions in it."""
+    async with db_manager.session_maker() as session:
+        started = time.perf_counter()
+        await GameDb(session).create_new_rounds(tg_id, sampling=mode)
+        elapsed = time.perf_counter() - started
+        inactive = await session.scalar(
+            sa.select(sa.func.count())
+            .select_from(Rounds)
+            .join(Question, Question.id == Rounds.question_id)
+            .where(Rounds.player_id == tg_id, Question.active == 0)
+        )
+        await session.rollback()
+    return elapsed, inactive
+
+
+async def bench_size(size: int, tg_ids: list[int]) -> dict:
+    await grow(size)
+    async with db_manager.session_maker() as session:
+        started = time.perf_counter()
+        # grow() inserts behind the cache's back
+        await active_question_ids.load(
+            QuestionDb(session).get_active_question_ids
+        )
+        reload_ms = (time.perf_counter() - started) * 1000
+    result = {"size": size, "reload_ms": round(reload_ms, 2)}
+    for mode in MODES:
+        timings, inactive = [], 0
+        for tg_id in tg_ids:
+            elapsed, picked_inactive = await pick(tg_id, mode)
+            timings.append(elapsed)
+            inactive += picked_inactive
+        percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+        result[mode] = {
+            "p50_ms": round(percentiles[49] * 1000, 2),
+            "p95_ms": round(percentiles[94] * 1000, 2),
+            "inactive": inactive,
+        }
+    return result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.db_url:
+        db_manager.url = args.db_url
+    engine = db_manager.get_engine()
+    if args.create_tables:
+        await db_manager.create_tables()
+    tg_ids = await add_players(args.samples)
+    results = []
+    for size in sorted(args.sizes):
+        result = await bench_size(size, tg_ids)
+        results.append(result)
+        print(  # noqa: T201
+            f"{size:>9} questions"
+            + "".join(
+                f"  {mode} p50 {result[mode]['p50_ms']:8.2f} ms"
+                f" p95 {result[mode]['p95_ms']:8.2f} ms"
+                for mode in MODES
+            )
+            + f"  id pool reload {result['reload_ms']:.1f} ms"
+        )
+    await db_manager.dispose()
+    return {"dialect": engine.dialect.name, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="instead of DB_* settings")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000]
+    )
+    parser.add_argument("--samples", type=int, default=50, help="players")
+    parser.add_argument("--out", type=Path, default=Path("bench/sampling.json"))
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
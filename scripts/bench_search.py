@@ -0,0 +1,180 @@
+"""Latency of question text search: ILIKE scanning the table against the
+trigram and full-text indexes, as the question table grows.
+
+Grows the question table to every --sizes step with texts of random
+words, then times QuestionDb.get_question_rows for --samples searches
+of a word and of a word fragment per mode, each in a rolled back
+transaction, and writes p50/p95 per size and mode as json:
+
+    python -m scripts.bench_search --sizes 10000 100000 1000000
+    python -m scripts.bench_search --db-url postgresql+asyncpg://... \
+        --create-tables --sizes 10000 100000
+
+Modes on postgres: `ilike_scan` is the substring search with index
+scans turned off, what it cost before ix_question_text_trgm;
+`ilike_trigram` the same search served by that index; `words_fts` the
+ranked words search on ix_question_text_fts. Other databases have
+neither index and only run `ilike_scan`. `rows` is the mean of found
+questions (the page is capped at --limit).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import string
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+
+from service.db_setup.db_settings import db_manager
+from service.db_setup.models import Question
+from service.db_watchers import QuestionDb
+from service.schemas import QuestionListRequest, QuestionSearchSchema
+
+PG_MODES = ("ilike_scan", "ilike_trigram", "words_fts")
+SEED_BATCH = 10_000
+WORDS_PER_QUESTION = 8
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+        for _ in range(size)
+    ]
+
+
+async def grow(size: int, vocabulary: list[str], rng: random.Random) -> None:
+    """Insert questions until the table has `size` rows."""
+    async with db_manager.session_maker() as session:
+        count = await session.scalar(sa.select(sa.func.count(Question.id)))
+        for start in range(count, size, SEED_BATCH):
+            await session.execute(
+                sa.insert(Question),
+                [
+                    {
+                        "text": " ".join(
+                            rng.choices(vocabulary, k=WORDS_PER_QUESTION)
+                        ),
+                        "active": 1,
+                    }
+                    for _ in range(start, min(start + SEED_BATCH, size))
+                ],
+            )
+        await session.commit()
+        if session.get_bind().dialect.name == "postgresql":
+            await session.execute(sa.text("ANALYZE question"))
+            await session.commit()
+
+
+def request_of(mode: str, term: str, limit: int) -> QuestionListRequest:
+    search = (
+        QuestionSearchSchema.words
+        if mode == "words_fts"
+        else QuestionSearchSchema.substring
+    )
+    return QuestionListRequest(text=term, search=search, limit=limit)
+
+
+async def search(mode: str, term: str, limit: int) -> tuple[float, int]:
+    """Seconds of one search, and the questions it found."""
+    async with db_manager.session_maker() as session:
+        if mode == "ilike_scan" and (
+            session.get_bind().dialect.name == "postgresql"
+        ):
+            await session.execute(sa.text("SET LOCAL enable_bitmapscan = off"))
+            await session.execute(sa.text("SET LOCAL enable_indexscan = off"))
+        started = time.perf_counter()
+        rows = await QuestionDb(session).get_question_rows(
+            request_of(mode, term, limit)
+        )
+        elapsed = time.perf_counter() - started
+        await session.rollback()
+    return elapsed, len(rows)
+
+
+def terms_of(mode: str, words: list[str]) -> list[str]:
+    """Whole words; substring modes look for every other one by a
+    fragment inside it, what only they find.
+    """
+    if mode == "words_fts":
+        return words
+    return [word[1:-1] if n % 2 else word for n, word in enumerate(words)]
+
+
+async def bench_size(
+    size: int, modes: tuple[str, ...], words: list[str], limit: int
+) -> dict:
+    result = {"size": size}
+    for mode in modes:
+        timings, found = [], []
+        for term in terms_of(mode, words):
+            elapsed, rows = await search(mode, term, limit)
+            timings.append(elapsed)
+            found.append(rows)
+        percentiles = statistics.quantiles(timings, n=100, method="inclusive")
+        result[mode] = {
+            "p50_ms": round(percentiles[49] * 1000, 2),
+            "p95_ms": round(percentiles[94] * 1000, 2),
+            "rows": round(statistics.mean(found), 1),
+        }
+    return result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.db_url:
+        db_manager.url = args.db_url
+    engine = db_manager.get_engine()
+    postgres = engine.dialect.name == "postgresql"
+    if args.create_tables:
+        if postgres:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                )
+        await db_manager.create_tables()
+    modes = PG_MODES if postgres else ("ilike_scan",)
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    words = rng.choices(vocabulary, k=args.samples)
+    results = []
+    for size in sorted(args.sizes):
+        await grow(size, vocabulary, rng)
+        result = await bench_size(size, modes, words, args.limit)
+        results.append(result)
+        print(  # noqa: T201
+            f"{size:>9} questions"
+            + "".join(
+                f"  {mode} p50 {result[mode]['p50_ms']:8.2f} ms"
+                f" p95 {result[mode]['p95_ms']:8.2f} ms"
+                for mode in modes
+            )
+        )
+    await db_manager.dispose()
+    return {"dialect": engine.dialect.name, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="instead of DB_* settings")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000]
+    )
+    parser.add_argument("--samples", type=int, default=50, help="searches")
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    parser.add_argument(
+        "--vocabulary", type=int, default=20_000, help="distinct words"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, default=Path("bench/search.json"))
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""CPU time to serialize 1000 questions of /v1/quiz and /v1/questions.
+
+"before" is what fastapi does with a returned object: ORM objects turned
+into pydantic models (convert_quiz_response), validated against the
+response_model, dumped to jsonable python and encoded by json.dumps.
+"after" is the fast path: rows straight to bytes with orjson.
+
+    python -m scripts.bench_serialization --questions 1000 --answers 4
+"""
+
+import argparse
+import asyncio
+import datetime
+import time
+from typing import NamedTuple
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from service.db_setup.models import Answer, Question
+from service.schemas import QuestionResponse, QuizResponse
+from service.utils import QuestionsManager
+
+
+class QuestionRow(NamedTuple):
+    id: int
+    text: str
+    active: int
+    updated_dt: datetime.datetime
+
+
+class AnswerRow(NamedTuple):
+    question_id: int
+    id: int
+    text: str
+    correct: bool
+
+
+def make_data(n_questions: int, n_answers: int):
+    now = datetime.datetime.now(tz=datetime.UTC)
+    questions, question_rows, answer_rows = [], [], []
+    for id_ in range(n_questions, 0, -1):
+        text = f"question number {id_} of the quiz?"
+        question = Question(text=text, active=1, updated_dt=now)
+        question.id = id_
+        question.answers = []
+        for n in range(n_answers):
+            answer = Answer(text=f"answer {n}", correct=n == 0, question_id=id_)
+            answer.id = id_ * n_answers + n
+            question.answers.append(answer)
+        questions.append(question)
+        question_rows.append(QuestionRow(id_, text, 1, now))
+        answer_rows.extend(
+            AnswerRow(id_, ans.id, ans.text, ans.correct)
+            for ans in question.answers
+        )
+    return questions, question_rows, answer_rows
+
+
+async def fastapi_body(field, content) -> bytes:
+    content = await serialize_response(
+        field=field, response_content=content, is_coroutine=True
+    )
+    return JSONResponse(content).body
+
+
+def cpu_ms(func, repeat: int) -> float:
+    """Best of `repeat` runs, in ms of process time."""
+    best = None
+    for _ in range(repeat):
+        started = time.process_time()
+        func()
+        spent = time.process_time() - started
+        best = spent if best is None else min(best, spent)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--answers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    questions, question_rows, answer_rows = make_data(
+        args.questions, args.answers
+    )
+    manager = QuestionsManager(None)
+    quiz_field = create_model_field("quiz", QuizResponse, mode="serialization")
+    list_field = create_model_field(
+        "questions", list[QuestionResponse], mode="serialization"
+    )
+    loop = asyncio.new_event_loop()
+
+    cases = {
+        "/v1/quiz before": lambda: loop.run_until_complete(
+            fastapi_body(quiz_field, manager.convert_quiz_response(questions))
+        ),
+        "/v1/quiz after": lambda: manager.quiz_json(question_rows, answer_rows),
+        "/v1/questions before": lambda: loop.run_until_complete(
+            fastapi_body(list_field, questions)
+        ),
+        "/v1/questions after": lambda: manager.questions_json(question_rows),
+    }
+    scale = 1000 / args.questions
+    for name, func in cases.items():
+        spent = cpu_ms(func, args.repeat) * scale
+        print(f"{name:22} {spent:8.2f} ms cpu per 1000 questions")  # noqa: T201
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
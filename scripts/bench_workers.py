@@ -0,0 +1,120 @@
+"""Throughput of the served app with 1..N uvicorn worker processes.
+
+Starts `python -m service` in prod mode for every worker count, loads
+one endpoint over real http from several client processes and writes
+requests per second of each run as json. Clients share the machine
+with the server, so give them cores to spare:
+
+    python -m scripts.bench_workers --workers 1 2 4 --clients 4
+    python -m scripts.bench_workers --path /v1/questions --seconds 20
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+
+async def load(url: str, seconds: float, concurrency: int) -> tuple[int, int]:
+    done, errors = 0, 0
+    deadline = time.monotonic() + seconds
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal done, errors
+        while time.monotonic() < deadline:
+            try:
+                response = await client.get(url)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            done += 1
+            if response.status_code >= 500:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return done, errors
+
+
+def client_process(args: tuple[str, float, int]) -> tuple[int, int]:
+    return asyncio.run(load(*args))
+
+
+def wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+        except httpx.HTTPError:
+            time.sleep(0.2)
+        else:
+            return
+    raise SystemExit(f"server at {url} did not start")
+
+
+def run(workers: int, args: argparse.Namespace) -> dict:
+    env = os.environ | {
+        "SERVE_MODE": "prod",
+        "WORKERS": str(workers),
+        "APP_HOST": "127.0.0.1",
+        "APP_PORT": str(args.port),
+        "TG_WORKER": "False",
+    }
+    server = subprocess.Popen([sys.executable, "-m", "service"], env=env)
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    try:
+        wait_ready(url)
+        # warm up pools and caches of every worker
+        client_process((url, 2, args.concurrency))
+        with multiprocessing.Pool(args.clients) as pool:
+            started = time.monotonic()
+            results = pool.map(
+                client_process,
+                [(url, args.seconds, args.concurrency)] * args.clients,
+            )
+            elapsed = time.monotonic() - started
+    finally:
+        server.terminate()
+        server.wait()
+    done = sum(result[0] for result in results)
+    return {
+        "workers": workers,
+        "requests": done,
+        "errors": sum(result[1] for result in results),
+        "rps": round(done / elapsed, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/tg-update-id")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=4, help="processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="each")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--out", type=Path, default=Path("bench/workers.json"))
+    args = parser.parse_args()
+
+    report = {"path": args.path, "cpus": os.cpu_count(), "runs": []}
+    for workers in args.workers:
+        result = run(workers, args)
+        report["runs"].append(result)
+        print(  # noqa: T201
+            f"workers {workers:3}  {result['rps']:>9} rps"
+            f"  errors {result['errors']}"
+        )
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
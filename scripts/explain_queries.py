@@ -0,0 +1,92 @@
+"""EXPLAIN (ANALYZE, BUFFERS) of every GameDb/QuestionDb query.
+
+Runs the real methods against the configured postgres, captures the SQL
+they send and explains it in the same transaction, which is rolled back.
+Run before and after `make alembic` and diff the files:
+
+    python -m scripts.explain_queries --label before --tg-id 1 --question-id 1
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from sqlalchemy import event
+
+from service.db_setup.db_settings import db_manager
+from service.db_watchers import GameDb, QuestionDb
+from service.schemas import QuestionListRequest, QuestionOrderSchema
+
+
+def calls(tg_id: int, question_id: int) -> list[tuple]:
+    """(db class, method, args) of every watched query."""
+    return [
+        (GameDb, "create_new_rounds", (tg_id,)),
+        (GameDb, "get_next_question_id", (tg_id,)),
+        (GameDb, "mark_question_answered", (question_id, tg_id)),
+        (GameDb, "raise_score", (tg_id,)),
+        (GameDb, "get_score_of_player", (tg_id,)),
+        (GameDb, "delete_old_rounds", (tg_id,)),
+        (QuestionDb, "find_correct_answers", (question_id,)),
+        (QuestionDb, "get_question_by_id", (question_id,)),
+        (QuestionDb, "get_active_question_ids", ()),
+        (
+            QuestionDb,
+            "get_question_rows",
+            (QuestionListRequest(order=QuestionOrderSchema.id),),
+        ),
+        (
+            QuestionDb,
+            "get_question_rows",
+            (QuestionListRequest(order=QuestionOrderSchema.updated_dt),),
+        ),
+        (QuestionDb, "get_quiz_rows", (QuestionListRequest(),)),
+    ]
+
+
+async def explain_all(tg_id: int, question_id: int) -> str:
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+
+    engine = db_manager.get_engine()
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    report = []
+    async with db_manager.session_maker() as session:
+        for db_class, method, args in calls(tg_id, question_id):
+            captured.clear()
+            await getattr(db_class(session), method)(*args)
+            name = f"{db_class.__name__}.{method}"
+            for statement, parameters in captured:
+                conn = await session.connection()
+                plan = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                )
+                report.append(f"-- {name}\n{statement}\n")
+                report.extend(row[0] for row in plan)
+                report.append("")
+        await session.rollback()
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    await db_manager.dispose()
+    return "\n".join(report)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--label", default="plans")
+    parser.add_argument("--tg-id", type=int, required=True)
+    parser.add_argument("--question-id", type=int, required=True)
+    parser.add_argument("--out-dir", type=Path, default=Path("explain"))
+    args = parser.parse_args()
+
+    report = asyncio.run(explain_all(args.tg_id, args.question_id))
+    args.out_dir.mkdir(exist_ok=True)
+    path = args.out_dir / f"{args.label}.txt"
+    path.write_text(report)
+    print(f"written {path}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Local stand-in for the telegram Bot API to test and load the tg worker.
+
+Simulated players send /start and /question, then press a random answer
+button of every question the bot sends them, so the worker is kept busy
+as long as it answers. Serves getUpdates (long poll), sendMessage and
+answerCallbackQuery for any token; GET /stats reports replies per second
+and latency from an update being fetched to the bot's reply.
+
+    python -m scripts.fake_bot_api --players 200 --port 8081
+    TG_WORKER=True TG_API_URL=http://127.0.0.1:8081 python -m service
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import time
+from collections import deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+
+class FakeBotApi:
+    def __init__(self, players: int, think_time: float) -> None:
+        self.think_time = think_time
+        self.updates: deque[dict] = deque()
+        self.update_ids = itertools.count(1)
+        self.callback_ids = itertools.count(1)
+        self.new_updates = asyncio.Event()
+        # tg_id -> when its last update was fetched by the bot
+        self.fetched_at: dict[int, float] = {}
+        self.latencies: deque[float] = deque(maxlen=100_000)
+        self.replies = 0
+        self.started = time.monotonic()
+        self.first_tg_id = 10**9
+        for tg_id in range(self.first_tg_id, self.first_tg_id + players):
+            self.send_text(tg_id, "/start")
+            self.send_text(tg_id, "/question")
+
+    def push(self, update: dict) -> None:
+        update["update_id"] = next(self.update_ids)
+        self.updates.append(update)
+        self.new_updates.set()
+
+    def send_text(self, tg_id: int, text: str) -> None:
+        self.push(
+            {
+                "message": {
+                    "message_id": 1,
+                    "from": {"id": tg_id},
+                    "chat": {"id": tg_id},
+                    "text": text,
+                }
+            }
+        )
+
+    def press(self, tg_id: int, data: str) -> None:
+        self.push(
+            {
+                "callback_query": {
+                    "id": str(next(self.callback_ids)),
+                    "from": {"id": tg_id},
+                    "message": {"message_id": 1, "chat": {"id": tg_id}},
+                    "data": data,
+                }
+            }
+        )
+
+    async def get_updates(self, params: dict) -> list[dict]:
+        offset = params.get("offset") or 0
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        if not self.updates:
+            self.new_updates.clear()
+            try:
+                await asyncio.wait_for(
+                    self.new_updates.wait(), params.get("timeout") or 0
+                )
+            except TimeoutError:
+                return []
+        batch = list(itertools.islice(self.updates, params.get("limit", 100)))
+        now = time.monotonic()
+        for update in batch:
+            body = update.get("message") or update["callback_query"]
+            self.fetched_at.setdefault(body["from"]["id"], now)
+        return batch
+
+    async def send_message(self, params: dict) -> dict:
+        tg_id = params["chat_id"]
+        fetched_at = self.fetched_at.pop(tg_id, None)
+        if fetched_at is not None:
+            self.latencies.append(time.monotonic() - fetched_at)
+        self.replies += 1
+        keyboard = (params.get("reply_markup") or {}).get("inline_keyboard")
+        if keyboard:
+            data = random.choice(keyboard)[0]["callback_data"]
+            asyncio.get_running_loop().call_later(
+                self.think_time, self.press, tg_id, data
+            )
+        elif params.get("text") == "No questions":
+            asyncio.get_running_loop().call_later(
+                self.think_time, self.send_text, tg_id, "/question"
+            )
+        return {"message_id": 1, "chat": {"id": tg_id}, "text": params["text"]}
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        result = {
+            "replies": self.replies,
+            "replies_per_second": round(self.replies / elapsed, 1),
+            "pending_updates": len(self.updates),
+        }
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+            result |= {
+                "p50_ms": round(cuts[49] * 1000, 2),
+                "p95_ms": round(cuts[94] * 1000, 2),
+                "p99_ms": round(cuts[98] * 1000, 2),
+            }
+        return result
+
+
+def create_app(players: int, think_time: float) -> FastAPI:
+    app = FastAPI()
+    state: dict[str, FakeBotApi] = {}
+
+    def get_api() -> FakeBotApi:
+        # made on the first request: its asyncio.Event needs the loop
+        if "api" not in state:
+            state["api"] = FakeBotApi(players, think_time)
+        return state["api"]
+
+    @app.post("/bot{token}/{method}")
+    async def bot_method(token: str, method: str, request: Request):
+        api = get_api()
+        params = await request.json()
+        if method == "getUpdates":
+            return {"ok": True, "result": await api.get_updates(params)}
+        if method == "sendMessage":
+            return {"ok": True, "result": await api.send_message(params)}
+        return {"ok": True, "result": True}
+
+    @app.get("/stats")
+    async def stats():
+        return get_api().stats()
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.players, args.think_time),
+        host="127.0.0.1",
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Size of the `round` table under a sustained game loop.
+
+Every simulated player plays /v1/turn in a loop, starting from
+/v1/round-question-id, while the rounds sweeper runs with a short
+interval. The row count is printed every --report seconds; with rounds
+refilled only on an empty queue and finished cycles swept, it stays
+under players * questions instead of growing with the number of turns:
+
+    python -m scripts.round_growth --questions 200 --players 100
+    python -m scripts.round_growth --db-url sqlite+aiosqlite:///g.db \
+        --create-tables --questions 50 --players 20 --seconds 30
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import sqlalchemy as sa
+
+from scripts.bench_endpoints import load_dataset, seed
+from service.__main__ import app  # noqa: PLC2701
+from service.db_setup.db_settings import db_manager
+from service.db_setup.models import Rounds
+from service.utils import sweep_rounds_forever
+
+
+async def count_rounds() -> int:
+    async with db_manager.session_maker() as session:
+        query = sa.select(sa.func.count()).select_from(Rounds)
+        return (await session.execute(query)).scalar_one()
+
+
+async def play(
+    client: httpx.AsyncClient, tg_id: int, answer_ids: list[int], deadline
+) -> int:
+    """Turns played by one player until the deadline, any answer will do."""
+    turns = 0
+    response = await client.post("/v1/round-question-id", json={"tg_id": tg_id})
+    if response.status_code != 200:
+        return turns
+    question_id = response.json()["question_id"]
+    while time.monotonic() < deadline:
+        response = await client.post(
+            "/v1/turn",
+            json={
+                "tg_id": tg_id,
+                "question_id": question_id,
+                "answer_ids": [random.choice(answer_ids)],
+            },
+        )
+        next_question = (
+            response.json()["next_question"]
+            if response.status_code == 200
+            else None
+        )
+        if next_question is None:
+            break
+        turns += 1
+        question_id = next_question["id"]
+    return turns
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.db_url:
+        db_manager.url = args.db_url
+    db_manager.get_engine()
+    if args.create_tables:
+        await db_manager.create_tables()
+    if args.questions or args.players:
+        await seed(args)
+    dataset = await load_dataset()
+    if not (dataset.question_ids and dataset.answer_ids and dataset.tg_ids):
+        raise SystemExit("empty dataset: seed questions and players first")
+    tg_ids = dataset.tg_ids[: args.players or None]
+
+    sweeper = asyncio.create_task(
+        sweep_rounds_forever(args.sweep_interval, args.sweep_batch)
+    )
+    deadline = time.monotonic() + args.seconds
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://growth"
+    ) as client:
+        players = asyncio.gather(
+            *(
+                play(client, tg_id, dataset.answer_ids, deadline)
+                for tg_id in tg_ids
+            )
+        )
+        started = time.monotonic()
+        peak = 0
+        while not players.done():
+            await asyncio.sleep(args.report)
+            rows = await count_rounds()
+            peak = max(peak, rows)
+            print(  # noqa: T201
+                f"{time.monotonic() - started:7.1f} s  rounds {rows:>9}"
+            )
+        turns = sum(await players)
+    sweeper.cancel()
+    await db_manager.dispose()
+    print(  # noqa: T201
+        f"{len(tg_ids)} players  {turns} turns  peak rounds {peak}"
+        f"  ({peak / len(tg_ids):.1f} per player)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", help="instead of DB_* settings")
+    parser.add_argument("--create-tables", action="store_true")
+    parser.add_argument("--questions", type=int, default=0, help="to seed")
+    parser.add_argument("--answers", type=int, default=4, help="per question")
+    parser.add_argument("--players", type=int, default=0, help="to seed")
+    parser.add_argument("--rounds", type=int, default=0, help="per player")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--report", type=float, default=5)
+    parser.add_argument("--sweep-interval", type=float, default=1)
+    parser.add_argument("--sweep-batch", type=int, default=5000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,118 @@
 import asyncio
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 import uvicorn
 from fastapi import FastAPI
 
-from service.config import logger
+from service.admission import AdmissionMiddleware
+from service.caches import answer_stats, update_id_mark
+from service.config import (
+    APP_HOST,
+    APP_PORT,
+    BACKLOG,
+    KEEP_ALIVE,
+    ROUND_SWEEP_INTERVAL,
+    SERVE_MODE,
+    TG_WORKER,
+    UPDATE_ID_IN_MEMORY,
+    UVICORN_HTTP,
+    UVICORN_LOOP,
+    WORKERS,
+    db_settings,
+    logger,
+)
+from service.db_setup.db_settings import db_manager
 from service.endpoints.data_handlers import api_router as data_routes
 from service.endpoints.game_handlers import api_router as game_routes
+from service.endpoints.metrics_handlers import api_router as metrics_routes
 from service.endpoints.tg_handlers import api_router as tg_routes
-
-"""
-class BackgroundTask:
-    async def long_running_task(self):
-        await asyncio.sleep(10)
-
-
-bgtask = BackgroundTask()
+from service.metrics import MetricsMiddleware
+from service.statement_budget import StatementBudgetMiddleware
+from service.tg_worker import TgWorker
+from service.utils import (
+    load_tg_update_id,
+    save_answer_stats,
+    save_tg_update_id,
+    sweep_rounds_forever,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    task = asyncio.create_task(bgtask.long_running_task())
+    db_manager.get_engine()
+    if db_settings["create_tables"]:
+        await db_manager.create_tables()
+    if UPDATE_ID_IN_MEMORY:
+        try:
+            await update_id_mark.restore(load_tg_update_id)
+        except Exception as exc:
+            # served requests restore it later
+            logger.error("update id not restored: ", exc_info=exc)
+        update_id_mark.start(save_tg_update_id)
+    answer_stats.start(save_answer_stats)
+    tg_worker = TgWorker() if TG_WORKER else None
+    if tg_worker:
+        tg_worker.start()
+    sweeper = (
+        asyncio.create_task(sweep_rounds_forever())
+        if ROUND_SWEEP_INTERVAL > 0
+        else None
+    )
     yield
-    task.cancel()
+    if sweeper:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
+    if tg_worker:
+        await tg_worker.stop()
     try:
-        await task
-    except asyncio.CancelledError:
-        logger.error("lifespan(): long_running_task is cancelled now")
+        await update_id_mark.stop(save_tg_update_id)
+    except Exception as exc:
+        # the bot gets the updates after the last saved id again
+        logger.error("update id not saved on shutdown: ", exc_info=exc)
+    try:
+        await answer_stats.stop(save_answer_stats)
+    except Exception as exc:
+        logger.error("answer stats lost on shutdown: ", exc_info=exc)
+    await db_manager.dispose()
+    logger.info("lifespan(): engine disposed")
 
 
 app = FastAPI(lifespan=lifespan)
-"""
-app = FastAPI()
+app.add_middleware(StatementBudgetMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
-list_of_routes = [data_routes, tg_routes, game_routes]
+list_of_routes = [data_routes, tg_routes, game_routes, metrics_routes]
 for route in list_of_routes:
     app.include_router(route)
 
 
+def serve() -> None:
+    """Each worker is a fresh spawned process importing the app, so its
+    engine and pool are made by its own lifespan and no connection is
+    shared between processes.
+    """
+    if SERVE_MODE != "prod":
+        uvicorn.run(
+            "service.__main__:app", host=APP_HOST, port=APP_PORT, reload=True
+        )
+        return
+    if TG_WORKER and WORKERS > 1:
+        # every process would poll getUpdates, telegram allows one
+        raise SystemExit("TG_WORKER=True needs WORKERS=1")
+    uvicorn.run(
+        "service.__main__:app",
+        host=APP_HOST,
+        port=APP_PORT,
+        workers=WORKERS,
+        loop=UVICORN_LOOP,
+        http=UVICORN_HTTP,
+        timeout_keep_alive=KEEP_ALIVE,
+        backlog=BACKLOG,
+        access_log=False,
+    )
+
+
 if __name__ == "__main__":
-    uvicorn.run("service.__main__:app", host="0.0.0.0", port=8000, reload=True)
+    serve()
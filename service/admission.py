@@ -0,0 +1,162 @@
+"""Admission control: turn requests away fast instead of queueing them.
+
+Without it a burst from one chat takes every pool connection and each
+further request waits pool_timeout seconds for one. Checked in order:
+
+- 429 when the player (tg_id in the query or the json body) already has
+  ADMISSION_PER_PLAYER requests in flight,
+- 503 when ADMISSION_MAX_IN_FLIGHT requests are in flight in this
+  process, by default twice the connections of the pool,
+- 503 when ADMISSION_MAX_POOL_WAITERS checkouts already wait for a
+  connection.
+
+Every rejection carries Retry-After and is counted by reason in
+http_admission_rejected_total.
+"""
+
+import json
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from service.config import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_POOL_WAITERS,
+    ADMISSION_PER_PLAYER,
+    ADMISSION_RETRY_AFTER,
+)
+from service.db_setup.db_settings import db_manager
+from service.metrics import ADMISSION_REJECTED, TimedQueuePool
+
+# served without the database, never rejected
+EXEMPT_PATHS = frozenset(
+    {"/metrics", "/docs", "/redoc", "/openapi.json", "/tg-update-id"}
+)
+# json bodies up to this size are read for a tg_id, larger ones are not
+MAX_PEEKED_BODY = 4096
+
+
+def pool_waiting() -> int:
+    engine = db_manager.engine
+    pool = engine.sync_engine.pool if engine is not None else None
+    return pool.waiting if isinstance(pool, TimedQueuePool) else 0
+
+
+def query_tg_id(scope) -> int | None:
+    values = parse_qs(scope["query_string"].decode("latin-1")).get("tg_id")
+    try:
+        return int(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def body_tg_id(body: bytes) -> int | None:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    tg_id = data.get("tg_id") if isinstance(data, dict) else None
+    return tg_id if isinstance(tg_id, int) else None
+
+
+class AdmissionMiddleware:
+    """Per-player and process-wide limits of requests in flight."""
+
+    def __init__(
+        self,
+        app,
+        per_player: int = ADMISSION_PER_PLAYER,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_pool_waiters: int = ADMISSION_MAX_POOL_WAITERS,
+        retry_after: int = ADMISSION_RETRY_AFTER,
+    ) -> None:
+        self.app = app
+        self.per_player = per_player
+        self.max_in_flight = max_in_flight
+        self.max_pool_waiters = max_pool_waiters
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.by_player: defaultdict[int, int] = defaultdict(int)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        tg_id = None
+        if self.per_player:
+            tg_id = query_tg_id(scope)
+            if tg_id is None:
+                tg_id, receive = await self.peek_body_tg_id(scope, receive)
+        reason = self.rejection(tg_id)
+        if reason is not None:
+            ADMISSION_REJECTED.labels(reason).inc()
+            await self.reject(send, reason)
+            return
+        self.in_flight += 1
+        if tg_id is not None:
+            self.by_player[tg_id] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            if tg_id is not None:
+                self.by_player[tg_id] -= 1
+                if not self.by_player[tg_id]:
+                    del self.by_player[tg_id]
+
+    def rejection(self, tg_id: int | None) -> str | None:
+        if tg_id is not None and self.by_player.get(tg_id, 0) >= (
+            self.per_player
+        ):
+            return "player"
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_pool_waiters and pool_waiting() >= self.max_pool_waiters:
+            return "pool"
+        return None
+
+    async def peek_body_tg_id(self, scope, receive):
+        """tg_id of a small json body, and a receive that replays it."""
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(
+            b"application/json"
+        ):
+            return None, receive
+        try:
+            length = int(headers.get(b"content-length", b""))
+        except ValueError:
+            return None, receive
+        if length > MAX_PEEKED_BODY:
+            return None, receive
+        messages = []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request" or not message.get(
+                "more_body"
+            ):
+                break
+        body = b"".join(m.get("body", b"") for m in messages)
+
+        async def replay():
+            return messages.pop(0) if messages else await receive()
+
+        return body_tg_id(body), replay
+
+    async def reject(self, send, reason: str) -> None:
+        if reason == "player":
+            status, detail = 429, "Too many requests of the player"
+        else:
+            status, detail = 503, "Server busy"
+        body = json.dumps({"detail": detail}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,508 @@
+import asyncio
+import datetime
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from typing import NamedTuple
+
+from service.config import (
+    ANSWER_STATS,
+    ANSWER_STATS_FLUSH_INTERVAL,
+    CORRECT_ANSWERS_CACHE_SIZE,
+    CORRECT_ANSWERS_TTL,
+    QUESTION_IDS_TTL,
+    QUIZ_VERSION_TTL,
+    SCORE_RANKS_TTL,
+    TG_UPDATE_FLUSH_INTERVAL,
+    logger,
+)
+from service.schemas import IsCorrectAnsResponse
+
+IdsLoader = Callable[[], Awaitable[Iterable[int]]]
+
+
+class ActiveQuestionIds:
+    """Process-local array of active question ids used for random sampling.
+
+    Kept current by `add()` and `discard()` after commits of question
+    changes here. The first `get()` waits for the table; after `ttl`
+    seconds (other workers change questions too) it is reloaded by a
+    background task while the old array keeps serving, and the changes
+    made during the reload are replayed onto the new one.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._ids: array | None = None
+        self._loaded_at: float | None = None
+        # question id -> active, changes made while a reload runs
+        self._during_reload: dict[int, bool] | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    async def _reload(self, loader: IdsLoader) -> None:
+        self._during_reload = {}
+        try:
+            ids = array("q", await loader())
+        finally:
+            changes, self._during_reload = self._during_reload, None
+        # the table may have been read before or after each change
+        for id_, active in changes.items():
+            if active and id_ not in ids:
+                ids.append(id_)
+            elif not active and id_ in ids:
+                ids.remove(id_)
+        self._ids = ids
+        self._loaded_at = time.monotonic()
+
+    async def _reload_in_background(self, reloader: IdsLoader) -> None:
+        try:
+            async with self._lock:
+                await self._reload(reloader)
+        except Exception as exc:
+            logger.error("active question ids not reloaded: ", exc_info=exc)
+        finally:
+            self._task = None
+
+    async def load(self, loader: IdsLoader) -> None:
+        """Reads the table and waits for it, e.g. after a bulk insert
+        that did not `add()` its ids.
+        """
+        async with self._lock:
+            await self._reload(loader)
+
+    async def get(self, loader: IdsLoader, reloader: IdsLoader) -> array:
+        """`loader` reads in the caller's session, only for the first
+        load. `reloader` opens its own session: stale ids are reloaded by
+        a task that may outlive the request.
+        """
+        if self._ids is None:
+            async with self._lock:
+                if self._ids is None:
+                    await self._reload(loader)
+        elif not self._is_fresh() and self._task is None:
+            self._task = asyncio.create_task(
+                self._reload_in_background(reloader)
+            )
+        return self._ids
+
+    async def sample(
+        self, loader: IdsLoader, reloader: IdsLoader, amount: int
+    ) -> list[int]:
+        ids = await self.get(loader, reloader)
+        return random.sample(ids, min(amount, len(ids)))
+
+    def add(self, *ids: int) -> None:
+        """Ids of committed new or activated questions, ignored until
+        loaded.
+        """
+        if self._during_reload is not None:
+            self._during_reload.update(dict.fromkeys(ids, True))
+        if self._ids is not None:
+            self._ids.extend(ids)
+
+    def discard(self, id_: int) -> None:
+        """Id of a committed deleted or deactivated question."""
+        if self._during_reload is not None:
+            self._during_reload[id_] = False
+        if self._ids is not None and id_ in self._ids:
+            self._ids.remove(id_)
+
+
+class CorrectAnswers(NamedTuple):
+    ids: frozenset[int]
+    # prebuilt results of compare_correct_answers, None if no correct answers
+    if_correct: IsCorrectAnsResponse | None
+    if_wrong: IsCorrectAnsResponse | None
+
+
+class CorrectAnswersIndex:
+    """Process-local LRU of question_id -> CorrectAnswers.
+
+    Entries are dropped by `invalidate()` when answers of the question
+    change here, and after `ttl` seconds for changes made by other workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, CorrectAnswers]] = (
+            OrderedDict()
+        )
+
+    def get(self, question_id: int) -> CorrectAnswers | None:
+        item = self._entries.get(question_id)
+        if item is None:
+            return None
+        loaded_at, entry = item
+        if time.monotonic() - loaded_at >= self.ttl:
+            del self._entries[question_id]
+            return None
+        self._entries.move_to_end(question_id)
+        return entry
+
+    def put(self, question_id: int, entry: CorrectAnswers) -> None:
+        self._entries[question_id] = (time.monotonic(), entry)
+        self._entries.move_to_end(question_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *question_ids: int) -> None:
+        for question_id in question_ids:
+            self._entries.pop(question_id, None)
+
+
+class Ranking:
+    """Player scores counted per distinct score in a Fenwick tree, for
+    ranks and score changes in O(log d), d the number of distinct scores.
+
+    Only a score never seen before costs O(d), to insert it and rebuild
+    the tree. Rank is 1 + the number of players with a higher score, so
+    equal scores share a rank.
+    """
+
+    def __init__(self, scores: Iterable[tuple[int, int]] = ()) -> None:
+        self._by_player: dict[int, int] = dict(scores)
+        self._counts = Counter(self._by_player.values())
+        self._scores = sorted(self._counts)
+        self._build()
+
+    def _build(self) -> None:
+        tree = [0] + [self._counts[score] for score in self._scores]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add(self, score: int, delta: int) -> None:
+        self._counts[score] += delta
+        i = bisect_left(self._scores, score)
+        if i == len(self._scores) or self._scores[i] != score:
+            self._scores.insert(i, score)
+            self._build()
+            return
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_up_to(self, score: int) -> int:
+        """Players with a score <= score."""
+        count = 0
+        i = bisect_right(self._scores, score)
+        while i:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+
+    def set(self, tg_id: int, score: int) -> None:
+        old = self._by_player.get(tg_id)
+        if old == score:
+            return
+        if old is not None:
+            self._add(old, -1)
+        self._add(score, 1)
+        self._by_player[tg_id] = score
+
+    def rank_of_score(self, score: int) -> int:
+        return len(self._by_player) - self._count_up_to(score) + 1
+
+    def rank(self, tg_id: int) -> tuple[int, int] | None:
+        """(rank, score) of a known player."""
+        score = self._by_player.get(tg_id)
+        if score is None:
+            return None
+        return self.rank_of_score(score), score
+
+    def __len__(self) -> int:
+        return len(self._by_player)
+
+
+class ScoreRanks:
+    """Process-local Ranking of all player scores, for ranks without
+    sorting the player table.
+
+    Kept current by `set()` after commits of score changes. The first
+    `load()` waits for the table; after `ttl` seconds (other workers
+    change scores too) it is reloaded by a background task while the old
+    ranking keeps serving, and the changes `set()` during the reload are
+    replayed onto the new one.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._ranking: Ranking | None = None
+        self._loaded_at: float | None = None
+        # changes set() while a reload runs, replayed onto its result
+        self._during_reload: dict[int, int] | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def _reload(
+        self, loader: Callable[[], Awaitable[Iterable[tuple[int, int]]]]
+    ) -> None:
+        self._during_reload = {}
+        try:
+            scores = await loader()
+            # sorting a big table would hold up the event loop
+            ranking = await asyncio.to_thread(Ranking, scores)
+        finally:
+            changes, self._during_reload = self._during_reload, None
+        for tg_id, score in changes.items():
+            ranking.set(tg_id, score)
+        self._ranking = ranking
+        self._loaded_at = time.monotonic()
+
+    async def _reload_in_background(
+        self, loader: Callable[[], Awaitable[Iterable[tuple[int, int]]]]
+    ) -> None:
+        try:
+            async with self._lock:
+                await self._reload(loader)
+        except Exception as exc:
+            logger.error("score ranks not reloaded: ", exc_info=exc)
+        finally:
+            self._task = None
+
+    async def load(
+        self, loader: Callable[[], Awaitable[Iterable[tuple[int, int]]]]
+    ) -> None:
+        """`loader` opens its own session, it may outlive the request."""
+        if self._ranking is None:
+            async with self._lock:
+                if self._ranking is None:
+                    await self._reload(loader)
+            return
+        if not self._is_fresh() and self._task is None:
+            self._task = asyncio.create_task(self._reload_in_background(loader))
+
+    def set(self, tg_id: int, score: int) -> None:
+        """New score of a player, ignored until loaded."""
+        if self._during_reload is not None:
+            self._during_reload[tg_id] = score
+        if self._ranking is not None:
+            self._ranking.set(tg_id, score)
+
+    def rank_of_score(self, score: int) -> int:
+        return self._ranking.rank_of_score(score) if self._ranking else 1
+
+    def rank(self, tg_id: int) -> tuple[int, int] | None:
+        """(rank, score) of a loaded player."""
+        return self._ranking.rank(tg_id) if self._ranking else None
+
+    def __len__(self) -> int:
+        return len(self._ranking) if self._ranking else 0
+
+
+class QuizVersion:
+    """Process-local version stamp of questions and answers, the base of
+    the ETags of the listings.
+
+    The stamp is the quiz_revision counter, reused for `ttl` seconds (other
+    workers' changes show up after that) and dropped by `invalidate()`
+    when questions or answers change here.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._stamp = ""
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def get(self, loader: Callable[[], Awaitable[Iterable]]) -> str:
+        if self._is_fresh():
+            return self._stamp
+        async with self._lock:
+            if not self._is_fresh():
+                self._stamp = "|".join(map(str, await loader()))
+                self._loaded_at = time.monotonic()
+        return self._stamp
+
+
+class UpdateIdMark:
+    """Process-local high-water mark of the telegram update id.
+
+    `advance()` only moves it forward and wakes the flusher, which waits
+    `interval` seconds to coalesce calls and then saves the latest value,
+    so the table gets a few writes per second however often the bot
+    polls. A crash loses at most `interval` of advances; the bot then
+    gets those updates again.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.value: int | None = None
+        self.restored = False
+        self._saved: int | None = None
+        self._dirty = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def restore(self, loader: Callable[[], Awaitable[int | None]]):
+        stored = await loader()
+        if stored is not None:
+            self.value = max(stored, self.value or stored)
+            self._saved = stored
+        self.restored = True
+
+    def advance(self, update_id: int) -> int:
+        if self.value is None or update_id > self.value:
+            self.value = update_id
+            self._dirty.set()
+        return self.value
+
+    async def flush(self, saver: Callable[[int], Awaitable[None]]) -> None:
+        value = self.value
+        if value is None or value == self._saved:
+            return
+        await saver(value)
+        self._saved = value
+
+    async def _run(self, saver: Callable[[int], Awaitable[None]]) -> None:
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(self.interval)
+            self._dirty.clear()
+            try:
+                await self.flush(saver)
+            except Exception as exc:
+                logger.error("update id not saved: ", exc_info=exc)
+                self._dirty.set()
+
+    def start(self, saver: Callable[[int], Awaitable[None]]) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(saver))
+
+    async def stop(self, saver: Callable[[int], Awaitable[None]]) -> None:
+        """Cancel the flusher and save what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(saver)
+
+
+class AnswerStats:
+    """Process-local answer counts per question, written behind.
+
+    `record()` only adds to a dict in the submission path; every
+    `interval` seconds the flusher hands all of them to the saver, one
+    batched upsert that adds them to question_stats. A crash loses at
+    most `interval` of counts, a failed flush keeps them for the next.
+    """
+
+    def __init__(self, interval: float, enabled: bool = True) -> None:
+        self.interval = interval
+        self.enabled = enabled
+        # question_id -> [attempts, correct, time.time() of the last one]
+        self._pending: dict[int, list] = {}
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, question_id: int, correct: bool) -> None:
+        if not self.enabled:
+            return
+        counts = self._pending.get(question_id)
+        if counts is None:
+            self._pending[question_id] = [1, int(correct), time.time()]
+            return
+        counts[0] += 1
+        counts[1] += correct
+        counts[2] = time.time()
+
+    def _merge(self, pending: dict[int, list]) -> None:
+        for question_id, (attempts, correct, last) in pending.items():
+            counts = self._pending.setdefault(question_id, [0, 0, last])
+            counts[0] += attempts
+            counts[1] += correct
+            counts[2] = max(counts[2], last)
+
+    async def flush(
+        self, saver: Callable[[list[dict]], Awaitable[None]]
+    ) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        rows = [
+            {
+                "question_id": question_id,
+                "attempts": attempts,
+                "correct": correct,
+                "last_answered_dt": datetime.datetime.fromtimestamp(
+                    last, tz=datetime.UTC
+                ),
+            }
+            for question_id, (attempts, correct, last) in pending.items()
+        ]
+        try:
+            await saver(rows)
+        except BaseException:
+            self._merge(pending)
+            raise
+
+    async def _run(self, saver: Callable[[list[dict]], Awaitable[None]]):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush(saver)
+            except Exception as exc:
+                logger.error("answer stats not saved: ", exc_info=exc)
+
+    def start(self, saver: Callable[[list[dict]], Awaitable[None]]) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run(saver))
+
+    async def stop(self, saver: Callable[[list[dict]], Awaitable[None]]):
+        """Cancel the flusher and save what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(saver)
+
+
+active_question_ids = ActiveQuestionIds(ttl=QUESTION_IDS_TTL)
+correct_answers_index = CorrectAnswersIndex(
+    maxsize=CORRECT_ANSWERS_CACHE_SIZE, ttl=CORRECT_ANSWERS_TTL
+)
+score_ranks = ScoreRanks(ttl=SCORE_RANKS_TTL)
+quiz_version = QuizVersion(ttl=QUIZ_VERSION_TTL)
+update_id_mark = UpdateIdMark(interval=TG_UPDATE_FLUSH_INTERVAL)
+answer_stats = AnswerStats(
+    interval=ANSWER_STATS_FLUSH_INTERVAL, enabled=ANSWER_STATS
+)
@@ -1,5 +1,6 @@
 import datetime
 import logging
+import os
 from os import environ
 
 import pytz
@@ -10,15 +11,98 @@ KEY = environ.get("KEY")
 assert KEY
 DEBUG = environ.get("DEBUG", None)
 
+# "dev" - one process with reload, "prod" - WORKERS processes, see __main__
+SERVE_MODE = environ.get("SERVE_MODE", "dev")
+APP_HOST = environ.get("APP_HOST", "0.0.0.0")
+APP_PORT = int(environ.get("APP_PORT", "8000"))
+WORKERS = int(environ.get("WORKERS", "0")) or os.cpu_count() or 1
+# one process keeps the telegram update id in memory, several workers
+# would each have their own, so they read and write the table instead
+UPDATE_ID_IN_MEMORY = SERVE_MODE != "prod" or WORKERS == 1
+# "auto" takes uvloop / httptools when they are installed
+UVICORN_LOOP = environ.get("UVICORN_LOOP", "auto")
+UVICORN_HTTP = environ.get("UVICORN_HTTP", "auto")
+KEEP_ALIVE = int(environ.get("KEEP_ALIVE", "5"))
+BACKLOG = int(environ.get("BACKLOG", "2048"))
+
 db_settings = {
     "db_name": environ.get("DB_NAME"),
     "db_host": environ.get("DB_HOST"),
     "db_user": environ.get("DB_USERNAME"),
-    "db_port": int(environ.get("DB_PORT")),
+    "db_port": int(environ.get("DB_PORT") or 0),
     "db_password": environ.get("DB_PASSWORD"),
     "db_driver": environ.get("DB_DRIVER"),
+    # full sqlalchemy url, replaces the DB_* parts above when set
+    "db_url": environ.get("DB_URL"),
+    # create missing tables at startup, for sqlite without migrations
+    "create_tables": environ.get("DB_CREATE_TABLES", "False") == "True",
+    # comma separated sqlalchemy urls of read replicas for GET handlers
+    "replica_urls": [
+        url.strip()
+        for url in environ.get("DB_REPLICA_URLS", "").split(",")
+        if url.strip()
+    ],
+    # "round_robin" or "least_connections"
+    "replica_balance": environ.get("DB_REPLICA_BALANCE", "round_robin"),
+    # seconds a client reads from the primary after its write, 0 - never
+    "read_your_writes": float(environ.get("DB_READ_YOUR_WRITES", "0")),
+    "pool_size": int(environ.get("DB_POOL_SIZE", "10")),
+    "max_overflow": int(environ.get("DB_MAX_OVERFLOW", "5")),
+    "pool_timeout": int(environ.get("DB_POOL_TIMEOUT", "20")),
+    "pool_recycle": int(environ.get("DB_POOL_RECYCLE", "280")),
+    "pool_pre_ping": environ.get("DB_POOL_PRE_PING", "True") == "True",
+    "echo": environ.get("DB_ECHO", "False") == "True",
 }
 
+# "id_pool" - sample from cached active ids, "random_sort" - ORDER BY random()
+ROUND_SAMPLING = environ.get("ROUND_SAMPLING", "id_pool")
+QUESTION_IDS_TTL = float(environ.get("QUESTION_IDS_TTL", "60"))
+CORRECT_ANSWERS_CACHE_SIZE = int(
+    environ.get("CORRECT_ANSWERS_CACHE_SIZE", "10000")
+)
+CORRECT_ANSWERS_TTL = float(environ.get("CORRECT_ANSWERS_TTL", "300"))
+# seconds between purges of finished rounds, 0 turns the sweeper off
+ROUND_SWEEP_INTERVAL = float(environ.get("ROUND_SWEEP_INTERVAL", "60"))
+ROUND_SWEEP_BATCH = int(environ.get("ROUND_SWEEP_BATCH", "5000"))
+SCORE_RANKS_TTL = float(environ.get("SCORE_RANKS_TTL", "60"))
+# seconds the ETag stamp of /v1/quiz and /v1/questions is reused
+QUIZ_VERSION_TTL = float(environ.get("QUIZ_VERSION_TTL", "1"))
+LEADERBOARD_MAX_LIMIT = int(environ.get("LEADERBOARD_MAX_LIMIT", "100"))
+QUESTION_BATCH_MAX = int(environ.get("QUESTION_BATCH_MAX", "500"))
+IMPORT_BATCH_SIZE = int(environ.get("IMPORT_BATCH_SIZE", "1000"))
+EXPORT_YIELD_PER = int(environ.get("EXPORT_YIELD_PER", "1000"))
+# per-question answer counts, flushed every interval (the loss window)
+ANSWER_STATS = environ.get("ANSWER_STATS", "True") == "True"
+ANSWER_STATS_FLUSH_INTERVAL = float(
+    environ.get("ANSWER_STATS_FLUSH_INTERVAL", "5")
+)
+# questions per upsert of a flush, the question_stats rows it locks at once
+ANSWER_STATS_BATCH_SIZE = int(environ.get("ANSWER_STATS_BATCH_SIZE", "1000"))
+# seconds to coalesce telegram update id writes
+TG_UPDATE_FLUSH_INTERVAL = float(environ.get("TG_UPDATE_FLUSH_INTERVAL", "0.5"))
+# in-process bot polling the Bot API, see service/tg_worker.py
+TG_WORKER = environ.get("TG_WORKER", "False") == "True"
+TG_API_URL = environ.get("TG_API_URL", "https://api.telegram.org")
+TG_TOKEN = environ.get("TELEGRAM_BOT_API_TOKEN", "")
+TG_WORKER_HANDLERS = int(environ.get("TG_WORKER_HANDLERS", "8"))
+TG_QUEUE_SIZE = int(environ.get("TG_QUEUE_SIZE", "256"))
+TG_POLL_TIMEOUT = int(environ.get("TG_POLL_TIMEOUT", "30"))
+# "log" or "raise" when a request runs more sql statements than its budget
+STATEMENT_BUDGET_MODE = environ.get("STATEMENT_BUDGET_MODE", "off")
+# admission control, see service/admission.py; 0 turns a limit off
+ADMISSION_PER_PLAYER = int(environ.get("ADMISSION_PER_PLAYER", "2"))
+# default: twice the connections the pool can open
+ADMISSION_MAX_IN_FLIGHT = int(
+    environ.get(
+        "ADMISSION_MAX_IN_FLIGHT",
+        str(2 * (db_settings["pool_size"] + db_settings["max_overflow"])),
+    )
+)
+ADMISSION_MAX_POOL_WAITERS = int(
+    environ.get("ADMISSION_MAX_POOL_WAITERS", str(db_settings["pool_size"]))
+)
+ADMISSION_RETRY_AFTER = int(environ.get("ADMISSION_RETRY_AFTER", "1"))
+
 
 def utcnow() -> datetime:
     """Datetime object with timezone awareness."""
@@ -1,21 +1,69 @@
+import time
+from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
+from fastapi import Request
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
+    async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import ORMExecuteState, Session
 
 from service.config import db_settings
+from service.db_setup.models import Base
+from service.metrics import TimedQueuePool, watch_engine
+from service.statement_budget import watch_statement_budgets
+
+CLIENT_ID_HEADER = "X-Client-Id"
+# session.info key, set once the session ran an insert, update or delete
+WROTE = "wrote"
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_write_statement(orm_execute_state: ORMExecuteState) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info[WROTE] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session: Session, flush_context) -> None:
+    session.info[WROTE] = True
 
 
 class DBManager:
-    def __init__(self):
+    """Holds one engine (and its pool) for the application lifetime,
+    plus one per read replica.
+    """
+
+    def __init__(
+        self, url: str | None = None, replica_urls: list[str] | None = None
+    ):
+        self.url = url
+        self.replica_urls = (
+            db_settings["replica_urls"]
+            if replica_urls is None
+            else replica_urls
+        )
         self.engine = None
+        self._session_maker = None
+        self._replica_session_makers = []
+        # open sessions per replica, for least_connections
+        self._replica_sessions: list[int] = []
+        self._next_replica = 0
+        # client -> time.monotonic() of its last write
+        self._last_writes: dict[str, float] = {}
 
     @property
     def uri(self) -> str:
+        if self.url or db_settings["db_url"]:
+            return self.url or db_settings["db_url"]
         return (
             f"{db_settings['db_driver']}"
             "://"
@@ -24,28 +72,154 @@ class DBManager:
         )
 
     def get_engine(self) -> AsyncEngine:
-        self.engine = create_async_engine(
-            self.uri,
-            pool_size=1,
-            max_overflow=0,
-            pool_recycle=280,
-            pool_timeout=20,
-            echo=True,
-            future=True,
-        )
+        if self.engine:
+            return self.engine
+        self.engine = self.create_engine(self.uri)
         return self.engine
 
+    async def create_tables(self) -> None:
+        """Tables from the models, for sqlite and test databases that
+        are not migrated with alembic.
+        """
+        async with self.get_engine().begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    def create_engine(self, uri: str, primary: bool = True) -> AsyncEngine:
+        options = {
+            "pool_recycle": db_settings["pool_recycle"],
+            "pool_pre_ping": db_settings["pool_pre_ping"],
+            "echo": db_settings["echo"],
+            "future": True,
+        }
+        engine = create_async_engine(
+            uri, **(options | self.pool_size_options(uri))
+        )
+        watch_engine(engine, pool_gauges=primary)
+        watch_statement_budgets(engine)
+        return engine
+
+    @staticmethod
+    def pool_size_options(uri: str) -> dict:
+        """Sqlite engines use a pool without size limits, but an in-memory
+        database lives in its one connection: it is kept for good and
+        sessions take turns on it.
+        """
+        url = make_url(uri)
+        if url.get_backend_name() == "sqlite":
+            if url.database in {None, "", ":memory:"} or (
+                url.query.get("mode") == "memory"
+            ):
+                return {
+                    "poolclass": TimedQueuePool,
+                    "pool_size": 1,
+                    "max_overflow": 0,
+                    "pool_recycle": -1,
+                    "pool_timeout": db_settings["pool_timeout"],
+                }
+            return {}
+        return {
+            "poolclass": TimedQueuePool,
+            "pool_size": db_settings["pool_size"],
+            "max_overflow": db_settings["max_overflow"],
+            "pool_timeout": db_settings["pool_timeout"],
+        }
+
     @property
-    def session_maker(self):
-        if not self.engine:
-            self.get_engine()
-        return sessionmaker(
-            self.engine, class_=AsyncSession, expire_on_commit=False
+    def session_maker(self) -> async_sessionmaker[AsyncSession]:
+        if not self._session_maker:
+            self._session_maker = async_sessionmaker(
+                self.get_engine(), class_=AsyncSession, expire_on_commit=False
+            )
+        return self._session_maker
+
+    @property
+    def replica_session_makers(self) -> list[async_sessionmaker[AsyncSession]]:
+        if self.replica_urls and not self._replica_session_makers:
+            self._replica_session_makers = [
+                async_sessionmaker(
+                    self.create_engine(url, primary=False),
+                    class_=AsyncSession,
+                    expire_on_commit=False,
+                )
+                for url in self.replica_urls
+            ]
+            self._replica_sessions = [0] * len(self.replica_urls)
+        return self._replica_session_makers
+
+    def pick_replica(self) -> int:
+        """Index of the replica for the next read session."""
+        if db_settings["replica_balance"] == "least_connections":
+            return min(
+                range(len(self._replica_sessions)),
+                key=self._replica_sessions.__getitem__,
+            )
+        index = self._next_replica
+        self._next_replica = (index + 1) % len(self._replica_sessions)
+        return index
+
+    def wrote(self, client: str) -> None:
+        """Remember a committed write of the client, see read_session."""
+        if db_settings["read_your_writes"] <= 0:
+            return
+        now = time.monotonic()
+        if len(self._last_writes) >= 10_000:
+            self._last_writes = {
+                key: at
+                for key, at in self._last_writes.items()
+                if now - at < db_settings["read_your_writes"]
+            }
+        self._last_writes[client] = now
+
+    def wrote_recently(self, client: str) -> bool:
+        at = self._last_writes.get(client)
+        return (
+            at is not None
+            and time.monotonic() - at < db_settings["read_your_writes"]
         )
 
+    @asynccontextmanager
+    async def read_session(
+        self, client: str | None = None
+    ) -> AsyncGenerator[AsyncSession, None]:
+        """Session on a replica. On the primary without replicas, or
+        for a client that wrote within the read_your_writes window, as
+        replicas may not have its write yet.
+        """
+        session_makers = self.replica_session_makers
+        if not session_makers or (client and self.wrote_recently(client)):
+            async with self.session_maker() as session:
+                yield session
+            return
+        index = self.pick_replica()
+        self._replica_sessions[index] += 1
+        try:
+            async with session_makers[index]() as session:
+                yield session
+        finally:
+            self._replica_sessions[index] -= 1
+
+    async def dispose(self) -> None:
+        if self.engine:
+            await self.engine.dispose()
+        for session_maker in self._replica_session_makers:
+            await session_maker.kw["bind"].dispose()
+        self.engine = None
+        self._session_maker = None
+        self._replica_session_makers = []
+        self._replica_sessions = []
+
 
-async def get_session() -> AsyncGenerator:
-    db_manager = DBManager()
+db_manager = DBManager()
+
+
+def client_key(request: Request) -> str:
+    """Who reads its own writes: X-Client-Id header, else the client host."""
+    if CLIENT_ID_HEADER in request.headers:
+        return request.headers[CLIENT_ID_HEADER]
+    return request.client.host if request.client else ""
+
+
+async def get_session(request: Request) -> AsyncGenerator:
     async with db_manager.session_maker() as session:
         try:
             yield session
@@ -53,7 +227,12 @@ async def get_session() -> AsyncGenerator:
         except Exception as exc:
             await session.rollback()
             raise exc
-        finally:
-            await session.close()
-            if db_manager.engine:
-                await db_manager.engine.dispose()
+        wrote = session.info.get(WROTE, False)
+    if wrote:
+        db_manager.wrote(client_key(request))
+
+
+async def get_read_session(request: Request) -> AsyncGenerator:
+    """Read only session of GET handlers, on a replica if there are any."""
+    async with db_manager.read_session(client_key(request)) as session:
+        yield session
@@ -0,0 +1,151 @@
+"""SQL that differs between the supported databases: PostgreSQL, MySQL
+and SQLite (aiosqlite).
+
+db_watchers builds statements through the Dialect of the session's
+engine (`dialect_of`) instead of checking the driver name. `utc_now()`
+is the server-side "now in UTC" of models.
+"""
+
+from collections.abc import Callable
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as ps_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class utc_now(FunctionElement):  # noqa: N801
+    """Current UTC timestamp, for server defaults and onupdate."""
+
+    type = sa.DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(utc_now, "postgresql")
+def _utc_now_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', now())"
+
+
+@compiles(utc_now, "mysql")
+def _utc_now_mysql(element, compiler, **kw):
+    return "(UTC_TIMESTAMP())"
+
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    # in UTC, with microseconds like the datetimes sqlalchemy stores: text
+    # of CURRENT_TIMESTAMP sorts below those of the same second
+    return "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+
+class Dialect:
+    """PostgreSQL, the base the others differ from."""
+
+    name = "postgresql"
+    # websearch_to_tsquery and the gin indexes of models.Question
+    words_search = True
+    # INSERT ... RETURNING of many rows, in the order of the parameters
+    returning_many = True
+    # UPDATE ... RETURNING
+    update_returning = True
+
+    def insert_ignore(self, table) -> sa.Insert:
+        """INSERT that skips rows conflicting with a unique key."""
+        return ps_insert(table).on_conflict_do_nothing()
+
+    def returning_id(self, query: sa.Insert, column) -> sa.Insert:
+        return query.returning(column)
+
+    def inserted_id(self, result) -> int | None:
+        """Id of a returning_id() insert, None if it was skipped."""
+        return result.scalar_one_or_none()
+
+    def upsert(
+        self, table, rows: list[dict], key, set_: Callable[[object], dict]
+    ) -> sa.Insert:
+        """Multi-row insert, conflicting rows updated by set_(new values)."""
+        query = ps_insert(table).values(rows)
+        return query.on_conflict_do_update(
+            index_elements=[key], set_=set_(query.excluded)
+        )
+
+    def random(self):
+        return sa.func.random()
+
+    def greatest(self, *args):
+        return sa.func.greatest(*args)
+
+    def limited_ids(self, query: sa.Select) -> sa.Select:
+        """Ids selected with LIMIT, to delete by."""
+        return query
+
+
+class MysqlDialect(Dialect):
+    name = "mysql"
+    words_search = False
+    returning_many = False
+    update_returning = False
+
+    def insert_ignore(self, table) -> sa.Insert:
+        return mysql_insert(table).prefix_with("IGNORE")
+
+    def returning_id(self, query: sa.Insert, column) -> sa.Insert:
+        return query
+
+    def inserted_id(self, result) -> int | None:
+        return result.lastrowid or None
+
+    def upsert(
+        self, table, rows: list[dict], key, set_: Callable[[object], dict]
+    ) -> sa.Insert:
+        query = mysql_insert(table).values(rows)
+        return query.on_duplicate_key_update(**set_(query.inserted))
+
+    def random(self):
+        return sa.func.rand()
+
+    def limited_ids(self, query: sa.Select) -> sa.Select:
+        # mysql can't delete from a table selected with LIMIT
+        return sa.select(query.subquery().c[0])
+
+
+class SqliteDialect(Dialect):
+    name = "sqlite"
+    words_search = False
+
+    def insert_ignore(self, table) -> sa.Insert:
+        # not ON CONFLICT: it is ambiguous after INSERT ... SELECT
+        return sa.insert(table).prefix_with("OR IGNORE")
+
+    def upsert(
+        self, table, rows: list[dict], key, set_: Callable[[object], dict]
+    ) -> sa.Insert:
+        query = sqlite_insert(table).values(rows)
+        return query.on_conflict_do_update(
+            index_elements=[key], set_=set_(query.excluded)
+        )
+
+    def greatest(self, *args):
+        # max() of several arguments is a scalar function in sqlite
+        return sa.func.max(*args)
+
+
+DIALECTS = {
+    dialect.name: dialect
+    for dialect in (Dialect(), MysqlDialect(), SqliteDialect())
+}
+
+
+def get_dialect(name: str) -> Dialect:
+    try:
+        return DIALECTS[name]
+    except KeyError:
+        raise ValueError(f"unsupported database: {name}") from None
+
+
+def dialect_of(session: AsyncSession) -> Dialect:
+    """Dialect of the engine the session runs on, primary or replica."""
+    return get_dialect(session.get_bind().dialect.name)
@@ -2,12 +2,15 @@ from datetime import datetime
 
 import sqlalchemy as sa
 from sqlalchemy import (
+    DDL,
     BigInteger,
     Boolean,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,  # DateTime, TIMESTAMP
+    event,
     text as sa_text,
 )
 from sqlalchemy.orm import (
@@ -19,6 +22,7 @@ from sqlalchemy.orm import (
 )
 
 from service.config import utcnow
+from service.db_setup.dialects import utc_now
 
 
 class Base(MappedAsDataclass, DeclarativeBase):
@@ -27,8 +31,31 @@ class Base(MappedAsDataclass, DeclarativeBase):
     pass
 
 
+QUESTION_TS_CONFIG = "simple"
+
+
 class Question(Base):
     __tablename__ = "question"
+    __table_args__ = (
+        Index("ix_question_active_id", "active", "id"),
+        Index("ix_question_active_updated_dt_id", "active", "updated_dt", "id"),
+        # substring search: ILIKE '%...%' is served by the trigram index
+        Index(
+            "ix_question_text_trgm",
+            "text",
+            postgresql_using="gin",
+            postgresql_ops={"text": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # words search: must stay equal to question_tsvector()
+        Index(
+            "ix_question_text_fts",
+            sa_text(
+                f"to_tsvector('{QUESTION_TS_CONFIG}'::regconfig, "
+                "coalesce(text, ''))"
+            ),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     text: Mapped[str] = mapped_column(Text, nullable=True)
@@ -38,17 +65,35 @@ class Question(Base):
     updated_dt: Mapped[datetime] = mapped_column(
         sa.DateTime(timezone=True),
         default_factory=utcnow,
-        server_default=sa_text("TIMEZONE('utc', now())"),
-        onupdate=sa_text("TIMEZONE('utc', now())"),
+        server_default=utc_now(),
+        # the same clock and precision as inserts
+        onupdate=utcnow,
+    )
+
+
+def question_tsvector():
+    """Same expression as in ix_question_text_fts, so postgres uses it."""
+    return sa.func.to_tsvector(
+        sa.literal_column(f"'{QUESTION_TS_CONFIG}'::regconfig"),
+        sa.func.coalesce(Question.text, sa.literal_column("''")),
+    )
+
+
+def question_tsquery(words: str):
+    return sa.func.websearch_to_tsquery(
+        sa.literal_column(f"'{QUESTION_TS_CONFIG}'::regconfig"), words
     )
 
 
 class Answer(Base):
     __tablename__ = "answer"
+    __table_args__ = (
+        Index("ix_answer_question_id_correct", "question_id", "correct"),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     text: Mapped[str] = mapped_column(String(255), nullable=True)
-    correct: Mapped[bool] = mapped_column(Boolean, server_default="0")
+    correct: Mapped[bool] = mapped_column(Boolean, server_default=sa.false())
     question_id: Mapped[int] = mapped_column(
         ForeignKey("question.id", ondelete="CASCADE")
     )
@@ -70,6 +115,7 @@ class User(Base):
 
 class Player(Base):
     __tablename__ = "player"
+    __table_args__ = (Index("ix_player_score_id", sa.desc("score"), "id"),)
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     tg_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
@@ -80,9 +126,19 @@ class Player(Base):
 
 class Rounds(Base):
     __tablename__ = "round"
+    __table_args__ = (
+        Index("ix_round_player_id_asked", "player_id", "asked"),
+        # a question is queued for a player at most once
+        Index(
+            "uq_round_player_id_question_id",
+            "player_id",
+            "question_id",
+            unique=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
-    asked: Mapped[bool] = mapped_column(Boolean, server_default="False")
+    asked: Mapped[bool] = mapped_column(Boolean, server_default=sa.false())
     question_id: Mapped[int] = mapped_column(
         ForeignKey("question.id", ondelete="CASCADE")
     )
@@ -91,7 +147,51 @@ class Rounds(Base):
     )
 
 
+class QuestionStats(Base):
+    """Answer counts per question, written behind by caches.AnswerStats.
+    No foreign key: a batch must not fail for a question deleted in the
+    meantime, the read endpoint joins question instead.
+    """
+
+    __tablename__ = "question_stats"
+
+    question_id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=False
+    )
+    attempts: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0"
+    )
+    correct: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0"
+    )
+    last_answered_dt: Mapped[datetime | None] = mapped_column(
+        sa.DateTime(timezone=True), nullable=True, default=None
+    )
+
+
 class TgUpdate(Base):
     __tablename__ = "tg_update"
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
+
+
+class QuizRevision(Base):
+    """A single row counting the changes of questions and answers, the
+    stamp of the listing ETags. QuestionDb.bump_quiz_revision adds one
+    in the transaction of every change.
+    """
+
+    __tablename__ = "quiz_revision"
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    revision: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0"
+    )
+
+
+# the row is there from the start: a bump is a plain UPDATE
+event.listen(
+    QuizRevision.__table__,
+    "after_create",
+    DDL("INSERT INTO quiz_revision (id, revision) VALUES (1, 0)"),
+)
@@ -1,32 +1,62 @@
-from collections.abc import Sequence
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterable, Sequence
+from operator import itemgetter
 
 import sqlalchemy as sa
-from sqlalchemy.dialects.mysql import insert as mysql_insert
-from sqlalchemy.dialects.postgresql import insert as ps_insert
+from sqlalchemy import Row, event
 
 # from sqlalchemy import select, update, or_, delete
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload  # , lazyload, load_only
+from sqlalchemy.orm import Session, selectinload  # , lazyload, load_only
 from sqlalchemy.sql.expression import false, true
 
-from service.config import db_settings, logger
+from service.caches import (
+    active_question_ids,
+    correct_answers_index,
+    quiz_version,
+    score_ranks,
+)
+from service.config import (
+    ANSWER_STATS_BATCH_SIZE,
+    EXPORT_YIELD_PER,
+    ROUND_SAMPLING,
+    logger,
+    utcnow,
+)
+from service.db_setup.db_settings import db_manager
+from service.db_setup.dialects import dialect_of
 from service.db_setup.models import (
     Answer,
     Player,
     Question,
+    QuestionStats,
+    QuizRevision,
     Rounds,
     TgUpdate,
     User,
+    question_tsquery,
+    question_tsvector,
+)
+from service.errors import InvalidCursorError
+from service.metrics import watch_db_methods
+from service.pagination import decode_cursor
+from service.schemas import (
+    QuestionAddRequest,
+    QuestionImportItem,
+    QuestionListRequest,
+    QuestionOrderSchema,
+    QuestionSearchSchema,
 )
-from service.schemas import QuestionAddRequest, QuestionListRequest
 
 
+@watch_db_methods
 class QuestionDb:
     session = None
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
+        self.dialect = dialect_of(session)
 
     async def add_question(self, data: QuestionAddRequest) -> int | None:
         vals = data.model_dump()
@@ -34,19 +64,79 @@ class QuestionDb:
             question = Question(**vals)
             self.session.add(question)
             await self.session.flush()
+            await self.bump_quiz_revision()
             await self.session.commit()
             await self.session.refresh(question)
         except Exception as exc:
             logger.error("Error adding question: ", exc_info=exc)
             await self.session.rollback()
             return None
+        if question.active == 1:
+            active_question_ids.add(question.id)
+        quiz_version.invalidate()
         logger.info("added question %s", question.id)
         return question.id
 
+    async def add_questions_with_answers(
+        self, items: list[QuestionImportItem]
+    ) -> list[int] | None:
+        """Multi-row insert of questions, then of all their answers."""
+        now = utcnow()
+        vals = [
+            {"text": item.text, "active": item.active, "updated_dt": now}
+            for item in items
+        ]
+        try:
+            if self.dialect.returning_many:
+                result = await self.session.execute(
+                    sa.insert(Question).returning(
+                        Question.id, sort_by_parameter_order=True
+                    ),
+                    vals,
+                )
+                ids = result.scalars().all()
+            else:
+                questions = [Question(**v) for v in vals]
+                self.session.add_all(questions)
+                await self.session.flush()
+                ids = [question.id for question in questions]
+            answers = [
+                {
+                    "text": answer.text,
+                    "correct": answer.correct,
+                    "question_id": id_,
+                }
+                for id_, item in zip(ids, items, strict=True)
+                for answer in item.answers
+            ]
+            if answers:
+                await self.session.execute(sa.insert(Answer), answers)
+            await self.bump_quiz_revision()
+            await self.session.commit()
+        except Exception as exc:
+            logger.error("Error adding questions: ", exc_info=exc)
+            await self.session.rollback()
+            return None
+        active_question_ids.add(
+            *(
+                id_
+                for id_, item in zip(ids, items, strict=True)
+                if item.active == 1
+            )
+        )
+        correct_answers_index.invalidate(*ids)
+        quiz_version.invalidate()
+        logger.info("added %s questions", len(ids))
+        return ids
+
     async def remove_question(self, id_: int) -> int:
         query = sa.delete(Question).filter(Question.id == id_)
         result = await self.session.execute(query)
+        await self.bump_quiz_revision()
         await self.session.commit()
+        active_question_ids.discard(id_)
+        correct_answers_index.invalidate(id_)
+        quiz_version.invalidate()
         return result.rowcount
 
     async def edit_question_by_id(
@@ -58,12 +148,41 @@ class QuestionDb:
         query_result = await self.session.get(Question, id_)
         if not query_result:
             return None
+        was_active = query_result.active == 1
         for key, value in vals.items():
             if value is not None:
                 setattr(query_result, key, value)
-        await self.session.flush()
+        # autoflush writes the question first
+        await self.bump_quiz_revision()
+        await self.session.commit()
+        quiz_version.invalidate()
+        # after commit, like the reloads that may read the table meanwhile
+        if query_result.active == 1 and not was_active:
+            active_question_ids.add(id_)
+        elif was_active and query_result.active != 1:
+            active_question_ids.discard(id_)
         return query_result
 
+    async def bump_quiz_revision(self) -> None:
+        """Counts a change of questions or answers, see get_quiz_stamp.
+        Run last before the commit: the row stays locked until then.
+        """
+        await self.session.execute(
+            sa.update(QuizRevision).values(revision=QuizRevision.revision + 1)
+        )
+
+    async def get_quiz_stamp(self) -> tuple:
+        """The revision, a primary key lookup; it moves with every added,
+        edited or deleted question or answer, in the same transaction.
+        """
+        query = sa.select(QuizRevision.revision).where(QuizRevision.id == 1)
+        return ((await self.session.execute(query)).scalar_one_or_none(),)
+
+    async def get_active_question_ids(self) -> Sequence[int]:
+        query = sa.select(Question.id).where(Question.active == 1)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
     async def find_correct_answers(self, question_id: int) -> Sequence[Answer]:
         query = sa.select(Answer).where(
             (Answer.question_id == question_id) & (Answer.correct == true())
@@ -71,6 +190,52 @@ class QuestionDb:
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def add_answer_stats(self, rows: list[dict]) -> None:
+        """Adds counts of AnswerStats.flush() rows to question_stats, one
+        upsert per ANSWER_STATS_BATCH_SIZE questions. Rows go in question_id
+        order, so the flushes of several workers lock question_stats rows
+        in the same order and cannot deadlock each other.
+        """
+        dialect = self.dialect
+        rows = sorted(rows, key=itemgetter("question_id"))
+
+        def totals(new) -> dict:
+            return {
+                "attempts": QuestionStats.attempts + new.attempts,
+                "correct": QuestionStats.correct + new.correct,
+                "last_answered_dt": dialect.greatest(
+                    sa.func.coalesce(
+                        QuestionStats.last_answered_dt, new.last_answered_dt
+                    ),
+                    new.last_answered_dt,
+                ),
+            }
+
+        for start in range(0, len(rows), ANSWER_STATS_BATCH_SIZE):
+            query = dialect.upsert(
+                QuestionStats,
+                rows[start : start + ANSWER_STATS_BATCH_SIZE],
+                QuestionStats.question_id,
+                totals,
+            )
+            await self.session.execute(query)
+
+    async def get_answer_stats(self, question_id: int) -> Row | None:
+        """Flushed counts of a question, None counts if never answered,
+        no row if there is no such question.
+        """
+        query = (
+            sa.select(
+                Question.id,
+                QuestionStats.attempts,
+                QuestionStats.correct,
+                QuestionStats.last_answered_dt,
+            )
+            .outerjoin(QuestionStats, QuestionStats.question_id == Question.id)
+            .where(Question.id == question_id)
+        )
+        return (await self.session.execute(query)).first()
+
     async def get_question_by_id(self, id_: int) -> Question | None:
         query = (
             sa.select(Question)
@@ -80,49 +245,135 @@ class QuestionDb:
         result = await self.session.execute(query)
         return result.scalars().first()
 
-    async def get_questions(self, data: QuestionListRequest) -> list[Question]:
-        """Without joining answers."""
-        data = data.model_dump()
-        orders = {
-            "id": Question.id.desc(),
-            "updated_dt": Question.updated_dt.desc(),
-            "active": Question.active.desc(),
-        }
-        order = orders.get(data["order"], None)
-
+    async def stream_questions_with_answers(
+        self, active: int
+    ) -> AsyncIterator[sa.Row]:
+        """Rows of question joined with answer, ordered by question id.
+        Fetched with a server-side cursor in chunks of EXPORT_YIELD_PER.
+        """
         query = (
-            sa.select(Question)
-            .where(Question.active == data["active"])
-            .order_by(order)
-            .limit(data["limit"])
-            .offset(data["offset"])
+            sa.select(
+                Question.id,
+                Question.text,
+                Question.active,
+                Answer.id.label("answer_id"),
+                Answer.text.label("answer_text"),
+                Answer.correct,
+            )
+            .outerjoin(Answer, Answer.question_id == Question.id)
+            .where(Question.active == active)
+            .order_by(Question.id, Answer.id)
+            .execution_options(yield_per=EXPORT_YIELD_PER)
         )
-        if data["text"]:
-            query = query.where(Question.text.ilike(f"%{data['text']}%"))
-        result = await self.session.execute(query)
-        res = result.scalars().all()
-        return res
+        result = await self.session.stream(query)
+        async for row in result:
+            yield row
+
+    @staticmethod
+    def _paginate(query: sa.Select, data: dict) -> sa.Select:
+        """Order by (order key, id) desc, page by cursor or offset."""
+        order = QuestionOrderSchema(data["order"] or QuestionOrderSchema.id)
+        column = getattr(Question, order.value)
+        if order == QuestionOrderSchema.id:
+            query = query.order_by(Question.id.desc())
+        else:
+            query = query.order_by(column.desc(), Question.id.desc())
+        if data["cursor"]:
+            key, last_id = decode_cursor(data["cursor"], order)
+            if order == QuestionOrderSchema.id:
+                query = query.where(Question.id < last_id)
+            else:
+                query = query.where(
+                    sa.tuple_(column, Question.id) < sa.tuple_(key, last_id)
+                )
+        else:
+            query = query.offset(data["offset"])
+        return query.limit(data["limit"])
+
+    def _search(self, query: sa.Select, data: dict) -> sa.Select:
+        """Text filter. Words search orders by rank, so call it before
+        _paginate.
+        """
+        if not data["text"]:
+            return query
+        if (
+            data["search"] == QuestionSearchSchema.words
+            and self.dialect.words_search
+        ):
+            if data["cursor"]:
+                raise InvalidCursorError("not supported for words search")
+            vector = question_tsvector()
+            ts_query = question_tsquery(data["text"])
+            return query.where(vector.op("@@")(ts_query)).order_by(
+                sa.func.ts_rank(vector, ts_query).desc()
+            )
+        return query.where(Question.text.ilike(f"%{data['text']}%"))
 
-    async def get_questions_with_answers(
+    async def get_question_rows(
         self, data: QuestionListRequest
-    ) -> list[Question]:
+    ) -> Sequence[sa.Row]:
+        """A page of questions without answers, as plain rows."""
         data = data.model_dump()
-        order = Question.id.desc() if data["order"] == "id" else None
+        query = self._search(
+            sa.select(
+                Question.id, Question.text, Question.active, Question.updated_dt
+            ).where(Question.active == data["active"]),
+            data,
+        )
+        query = self._paginate(query, data)
+        return (await self.session.execute(query)).all()
 
-        query = (
-            sa.select(Question)
-            .where(Question.active == data["active"])
-            .options(selectinload(Question.answers))
-            .order_by(order)
-            .limit(data["limit"])
-            .offset(data["offset"])
+    async def get_quiz_rows(
+        self, data: QuestionListRequest
+    ) -> tuple[Sequence[sa.Row], Sequence[sa.Row]]:
+        """A page of questions as rows, and rows of their answers ordered
+        by question_id, id.
+        """
+        data = data.model_dump()
+        query = self._search(
+            sa.select(
+                Question.id, Question.text, Question.active, Question.updated_dt
+            ).where(Question.active == data["active"]),
+            data,
         )
-        if data["text"]:
-            query = query.where(Question.text.ilike(f"%{data['text']}%"))
+        query = self._paginate(query, data)
         if data.get("question_id"):
             query = query.where(Question.id == data["question_id"])
-        result = await self.session.execute(query)
-        return result.scalars().unique()
+        questions = (await self.session.execute(query)).all()
+        return questions, await self._answer_rows(questions)
+
+    async def get_quiz_rows_by_ids(
+        self, ids: Sequence[int]
+    ) -> tuple[Sequence[sa.Row], Sequence[sa.Row]]:
+        """Questions with these ids (any order, missing ones skipped) and
+        their answers, in one IN query each.
+        """
+        query = sa.select(
+            Question.id, Question.text, Question.active, Question.updated_dt
+        ).where(Question.id.in_(ids))
+        questions = (await self.session.execute(query)).all()
+        return questions, await self._answer_rows(questions)
+
+    async def _answer_rows(
+        self, questions: Sequence[sa.Row]
+    ) -> Sequence[sa.Row]:
+        if not questions:
+            return []
+        answers = await self.session.execute(
+            sa.select(
+                Answer.question_id, Answer.id, Answer.text, Answer.correct
+            )
+            .where(Answer.question_id.in_([row.id for row in questions]))
+            .order_by(Answer.question_id, Answer.id)
+        )
+        return answers.all()
+
+
+@watch_db_methods
+async def load_active_question_ids() -> Sequence[int]:
+    """Own session, active_question_ids reloads after the request is done."""
+    async with db_manager.read_session() as session:
+        return await QuestionDb(session).get_active_question_ids()
 
 
 class AnswerDb:
@@ -136,18 +387,30 @@ class AnswerDb:
             answer = Answer(**vals)
             self.session.add(answer)
             await self.session.flush()
+            await QuestionDb(self.session).bump_quiz_revision()
             await self.session.commit()
             await self.session.refresh(answer)
         except Exception as exc:
             logger.error("Error adding answer: ", exc_info=exc)
             await self.session.rollback()
             return None
+        correct_answers_index.invalidate(answer.question_id)
+        quiz_version.invalidate()
         logger.info("added answer %s", answer.id)
         return answer.id
 
     async def remove_answer(self, id_: int) -> int:
+        question_id = await self.session.scalar(
+            sa.select(Answer.question_id).where(Answer.id == id_)
+        )
         query = sa.delete(Answer).where(Answer.id == id_)
         result = await self.session.execute(query)
+        await QuestionDb(self.session).bump_quiz_revision()
+        # after commit: a reload before it would cache the deleted answer
+        await self.session.commit()
+        if question_id is not None:
+            correct_answers_index.invalidate(question_id)
+        quiz_version.invalidate()
         return result.rowcount
 
     async def get_answer_by_id(self, ans_id: int) -> Answer | None:
@@ -164,11 +427,14 @@ class TgDb:
         self.session = session
 
     async def update_tg_id(self, id_: int) -> None:
-        query = sa.update(TgUpdate).values(id=id_)
-        await self.session.execute(query)
+        """Only moves forward, like SET id = GREATEST(id, :id_)."""
+        query = sa.update(TgUpdate).where(TgUpdate.id < id_).values(id=id_)
+        result = await self.session.execute(query)
+        if result.rowcount == 0 and await self.get_last_tg_id() is None:
+            await self.session.execute(sa.insert(TgUpdate).values(id=id_))
 
     async def get_last_tg_id(self) -> int | None:
-        query = sa.select(TgUpdate.id).limit(1)
+        query = sa.select(sa.func.max(TgUpdate.id))
         res = (await self.session.execute(query)).scalar_one_or_none()
         return res
 
@@ -187,23 +453,15 @@ class UserDb:
         return data
 
     async def put(self, session, username, password):
-        vals = {"username": username, "password": password}
-        if "postgresql" in db_settings["db_driver"]:
-            query = (
-                ps_insert(self.model)
-                .values(**vals)
-                .on_conflict_do_nothing()
-                .returning(self.model.id)
-            )
-        else:
-            query = (
-                mysql_insert(self.model).values(**vals).prefix_with("IGNORE")
-            )
-
+        dialect = dialect_of(session)
+        query = dialect.returning_id(
+            dialect.insert_ignore(self.model).values(
+                username=username, password=password
+            ),
+            self.model.id,
+        )
         result = await session.execute(query)
-        if "postgresql" in db_settings["db_driver"]:
-            return result.returned_defaults[0]
-        return result.lastrowid if result.lastrowid else None
+        return dialect.inserted_id(result)
 
     async def update(self, session):
         vals = {"id": 100, User.active.key: User.active or 0}
@@ -227,27 +485,88 @@ class UserDb:
         return result.rowcount
 
 
+# session.info key of the scores a transaction changed, tg_id -> score
+PENDING_SCORES = "pending_scores"
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_scores(session: Session) -> None:
+    """score_ranks learns of score changes only once they are committed."""
+    for user_tg_id, score in session.info.pop(PENDING_SCORES, {}).items():
+        score_ranks.set(user_tg_id, score)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_pending_scores(session: Session, transaction) -> None:
+    """Rolled back or closed without commit: forget the changes."""
+    if transaction.parent is None:
+        session.info.pop(PENDING_SCORES, None)
+
+
+@watch_db_methods
 class GameDb:
     session = None
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
-
-    async def create_new_rounds(self, user_tg_id: int, amount: int = 5) -> None:
-        """To Round model -> question_id, user_tg_id."""
-        sub_query_choice = (
-            sa.select(Question.id, sa.cast(user_tg_id, sa.Integer))
-            .order_by(sa.func.random())
-            .limit(amount)
+        self.dialect = dialect_of(session)
+
+    async def _choose_questions_query(
+        self, user_tg_id: int, amount: int, sampling: str = ROUND_SAMPLING
+    ):
+        """Select of (question_id, player_id) for random active questions
+        not queued or asked for the player yet.
+        """
+        query = (
+            sa.select(Question.id, sa.cast(user_tg_id, sa.BigInteger))
+            .where(Question.active == 1)
+            .where(
+                ~sa.exists().where(
+                    Rounds.player_id == user_tg_id,
+                    Rounds.question_id == Question.id,
+                )
+            )
+        )
+        if sampling == "random_sort":
+            return query.order_by(self.dialect.random()).limit(amount)
+        # twice as many, as some of them may be in the rounds already
+        question_ids = await active_question_ids.sample(
+            QuestionDb(self.session).get_active_question_ids,
+            load_active_question_ids,
+            amount * 2,
         )
-        query_insert_rounds = sa.insert(Rounds).from_select(
+        # ids may be stale, so they are re-checked by primary key
+        return query.where(Question.id.in_(question_ids)).limit(amount)
+
+    async def create_new_rounds(
+        self, user_tg_id: int, amount: int = 5, sampling: str = ROUND_SAMPLING
+    ) -> int:
+        """To Round model -> question_id, user_tg_id. Questions already in
+        the player's rounds are skipped, also when a concurrent request
+        inserts them first. Returns the number of added rounds, 0 only
+        when every active question is in the player's rounds.
+        """
+        added = await self._insert_rounds(user_tg_id, amount, sampling)
+        if not added and sampling != "random_sort":
+            # the sampled ids may all be in the rounds, while others are not
+            added = await self._insert_rounds(user_tg_id, amount, "random_sort")
+        return added
+
+    async def _insert_rounds(
+        self, user_tg_id: int, amount: int, sampling: str
+    ) -> int:
+        sub_query_choice = await self._choose_questions_query(
+            user_tg_id, amount, sampling
+        )
+        query_insert_rounds = self.dialect.insert_ignore(Rounds).from_select(
             ["question_id", "player_id"], sub_query_choice
         )
         try:
-            await self.session.execute(query_insert_rounds)
+            result = await self.session.execute(query_insert_rounds)
         except IntegrityError as err:
             logger.error("error ", exc_info=err)
             raise err
+        return result.rowcount
 
     async def delete_old_rounds(self, user_tg_id: int) -> None:
         query = sa.delete(Rounds).where(
@@ -255,21 +574,68 @@ class GameDb:
         )
         await self.session.execute(query)
 
-    async def raise_score(self, user_tg_id: int) -> int | None:
-        player_result = (
-            (
-                await self.session.execute(
-                    sa.select(Player).where(Player.tg_id == user_tg_id)
-                )
-            )
-            .scalars()
-            .first()
+    async def sweep_asked_rounds(self, batch: int) -> int:
+        """Delete up to `batch` asked rounds of players who were asked
+        every active question, whose history starts over anyway. Others
+        keep theirs: it stops new rounds from repeating questions.
+        """
+        active = (
+            sa.select(sa.func.count(Question.id))
+            .where(Question.active == 1)
+            .scalar_subquery()
         )
-        if not player_result:
-            return None
-        player_result.score += 1
-        await self.session.flush()
-        return player_result.score
+        # asked rounds are unique per question, so their count tells
+        done_players = (
+            sa.select(Rounds.player_id)
+            .join(Question, Question.id == Rounds.question_id)
+            .where(Rounds.asked == true(), Question.active == 1)
+            .group_by(Rounds.player_id)
+            .having(sa.func.count() >= active)
+        )
+        ids = self.dialect.limited_ids(
+            sa.select(Rounds.id)
+            .where(Rounds.asked == true(), Rounds.player_id.in_(done_players))
+            .limit(batch)
+        )
+        query = sa.delete(Rounds).where(Rounds.id.in_(ids))
+        result = await self.session.execute(query)
+        return result.rowcount
+
+    async def raise_score(self, user_tg_id: int, delta: int = 1) -> int | None:
+        """Adds delta to score in one UPDATE, concurrent calls add up."""
+        scores = await self.raise_scores([(user_tg_id, delta)])
+        return scores.get(user_tg_id)
+
+    async def raise_scores(
+        self, deltas: Iterable[tuple[int, int]]
+    ) -> dict[int, int]:
+        """Many (tg_id, delta) in one UPDATE. New score of found players."""
+        by_player = defaultdict(int)
+        for user_tg_id, delta in deltas:
+            by_player[user_tg_id] += delta
+        if not by_player:
+            return {}
+        if len(by_player) == 1:
+            increment = next(iter(by_player.values()))
+        else:
+            increment = sa.case(by_player, value=Player.tg_id, else_=0)
+        query = (
+            sa.update(Player)
+            .where(Player.tg_id.in_(by_player))
+            .values(score=Player.score + increment)
+            .execution_options(synchronize_session=False)
+        )
+        if self.dialect.update_returning:
+            query = query.returning(Player.tg_id, Player.score)
+            scores = dict((await self.session.execute(query)).tuples().all())
+        else:
+            await self.session.execute(query)
+            query = sa.select(Player.tg_id, Player.score).where(
+                Player.tg_id.in_(by_player)
+            )
+            scores = dict((await self.session.execute(query)).tuples().all())
+        self.session.info.setdefault(PENDING_SCORES, {}).update(scores)
+        return scores
 
     async def get_next_question_id(self, user_tg_id: int) -> int | None:
         query = sa.select(Rounds.question_id).where(
@@ -292,25 +658,31 @@ class GameDb:
         await self.session.execute(query)
 
     async def create_player(self, user_tg_id: int) -> int | None:
-        if "postgresql" in db_settings["db_driver"]:
-            query = (
-                ps_insert(Player)
-                .values(tg_id=user_tg_id)
-                .on_conflict_do_nothing()
-                .returning(Player.id)
-            )
-        else:
-            query = (
-                mysql_insert(Player)
-                .values(tg_id=user_tg_id)
-                .prefix_with("IGNORE")
-            )
+        query = self.dialect.returning_id(
+            self.dialect.insert_ignore(Player).values(tg_id=user_tg_id),
+            Player.id,
+        )
         result = await self.session.execute(query)
-        if "postgresql" in db_settings["db_driver"]:
-            return result.returned_defaults[0]
-        return result.lastrowid if result.lastrowid else None
+        player_id = self.dialect.inserted_id(result)
+        if player_id is not None:
+            self.session.info.setdefault(PENDING_SCORES, {})[user_tg_id] = 0
+        return player_id
 
     async def get_score_of_player(self, user_tg_id: int) -> int | None:
         query = sa.select(Player.score).where(Player.tg_id == user_tg_id)
         result = await self.session.execute(query)
         return result.scalars().first()
+
+    async def get_all_scores(self) -> Sequence[tuple[int, int]]:
+        """(tg_id, score) of every player, to load score_ranks."""
+        query = sa.select(Player.tg_id, Player.score)
+        return (await self.session.execute(query)).tuples().all()
+
+    async def get_leaderboard(self, limit: int) -> Sequence[tuple[int, int]]:
+        """(tg_id, score) of top players, read from ix_player_score_id."""
+        query = (
+            sa.select(Player.tg_id, Player.score)
+            .order_by(Player.score.desc(), Player.id)
+            .limit(limit)
+        )
+        return (await self.session.execute(query)).tuples().all()
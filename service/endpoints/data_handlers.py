@@ -1,21 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from service.config import logger
-from service.db_setup.db_settings import get_session
-from service.errors import AnswerNotAddedError
+from service.db_setup.db_settings import (
+    client_key,
+    db_manager,
+    get_read_session,
+    get_session,
+)
+from service.errors import AnswerNotAddedError, InvalidCursorError
 from service.schemas import (
     AnswerAddRequest,
     AnswerAddResponse,
     AnswerResponse,
     AnswerSubmitRequest,
+    ExportFormatSchema,
     IsCorrectAnsResponse,
     QuestionAddRequest,
     QuestionAddResponse,
+    QuestionBatchRequest,
+    QuestionBatchResponse,
     QuestionEditRequest,
+    QuestionImportItem,
+    QuestionImportResponse,
     QuestionListRequest,
     QuestionResponse,
+    QuestionStatsResponse,
+    QuizExportRequest,
     QuizResponse,
 )
 from service.utils import AnswersManager, QuestionsManager
@@ -25,41 +48,174 @@ api_router = APIRouter(
     tags=["quiz"],
 )
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def json_response(
+    body: bytes, next_cursor: str | None, etag: str | None = None
+) -> Response:
+    """Already serialized body: response_model only documents it,
+    fastapi does not validate and encode it again.
+    """
+    headers = {}
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    if etag:
+        headers["ETag"] = etag
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+    )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match compares weakly: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in tags
+
+
+async def ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """Non-empty lines of a streamed body, without reading it whole."""
+    tail = b""
+    async for chunk in request.stream():
+        *lines, tail = (tail + chunk).split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if tail.strip():
+        yield tail
+
 
 @api_router.get(
     "/quiz",
     response_model=QuizResponse,
     responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "Not modified"},
         status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
         status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
     },
 )
 async def show_quiz(
+    request: Request,
     params: QuestionListRequest = Depends(),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    """Show quiz-test page."""
+    """Show quiz-test page. Next page cursor is in X-Next-Cursor header.
+    Answers 304 to If-None-Match with the current ETag.
+    """
     q_manager = QuestionsManager(session)
-    questions = await q_manager.get_questions_with_answers(params)
-    return questions if questions else {}
+    etag = await q_manager.listing_etag(
+        f"{request.url.path}?{request.url.query}"
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    try:
+        body, next_cursor = await q_manager.get_quiz_json(params)
+    except InvalidCursorError as err:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, err.add_detail
+        ) from err
+    return json_response(body, next_cursor, etag)
+
+
+@api_router.get(
+    "/quiz/export",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def export_quiz(request: Request, params: QuizExportRequest = Depends()):
+    """Stream all questions with answers as ndjson or csv."""
+    client = client_key(request)
+
+    async def body():
+        # own session: get_session is closed before a streamed body is sent
+        async with db_manager.read_session(client) as session:
+            async for chunk in QuestionsManager(session).export_quiz(params):
+                yield chunk
+
+    if params.format == ExportFormatSchema.csv:
+        return StreamingResponse(body(), media_type="text/csv")
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
 
 
 @api_router.get(
     "/questions",
     response_model=list[QuestionResponse],
     responses={
+        status.HTTP_304_NOT_MODIFIED: {"description": "Not modified"},
         status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
         status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
     },
 )
 async def get_questions(
+    request: Request,
     data=Depends(QuestionListRequest),
-    session: AsyncSession = Depends(get_session),
-) -> list[QuestionResponse]:
-    """Get_questions."""
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Get_questions. Next page cursor is in X-Next-Cursor header.
+    Answers 304 to If-None-Match with the current ETag.
+    """
+    q_manager = QuestionsManager(session)
+    etag = await q_manager.listing_etag(
+        f"{request.url.path}?{request.url.query}"
+    )
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    try:
+        body, next_cursor = await q_manager.get_questions_json(data)
+    except InvalidCursorError as err:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, err.add_detail
+        ) from err
+    return json_response(body, next_cursor, etag)
+
+
+@api_router.post(
+    "/questions/batch",
+    response_model=QuestionBatchResponse,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def get_questions_batch(
+    data: QuestionBatchRequest,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Questions with answers by ids, e.g. a whole round at once."""
     q_manager = QuestionsManager(session)
-    questions = await q_manager.get_questions(data)
-    return questions if questions else []
+    body = await q_manager.get_questions_batch_json(data.ids)
+    return json_response(body, None)
+
+
+@api_router.get(
+    "/question/{id_}/stats",
+    response_model=QuestionStatsResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Not found"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def get_question_stats(
+    id_: int,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """How often the question was answered, and correctly. Counts are
+    written behind, they lag up to ANSWER_STATS_FLUSH_INTERVAL seconds.
+    """
+    stats = await QuestionsManager(session).get_answer_stats(id_)
+    if stats is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    return stats
 
 
 @api_router.post(
@@ -82,6 +238,47 @@ async def add_question(
     raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
 
 
+@api_router.post(
+    "/questions/import",
+    response_model=QuestionImportResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+    },
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": QuestionImportItem.model_json_schema(),
+                    }
+                },
+                NDJSON_MEDIA_TYPE: {
+                    "schema": QuestionImportItem.model_json_schema()
+                },
+            },
+        }
+    },
+)
+async def import_questions(
+    request: Request, session: AsyncSession = Depends(get_session)
+):
+    """Bulk import of questions with answers: a json array, or one
+    question per line with Content-Type application/x-ndjson.
+    """
+    q_manager = QuestionsManager(session)
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        return await q_manager.import_questions(ndjson_lines(request))
+    try:
+        items = json.loads(await request.body())
+    except ValueError as err:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Bad json") from err
+    if not isinstance(items, list):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Expected array")
+    return await q_manager.import_questions(items)
+
+
 @api_router.patch(
     "/question/{id_}",
     responses={
@@ -199,7 +396,7 @@ async def delete_answer(
 )
 async def get_answer(
     id_: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Request for get_answer."""
     a_manager = AnswersManager(session)
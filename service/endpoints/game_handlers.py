@@ -3,16 +3,24 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from service.config import logger
-from service.db_setup.db_settings import get_session
+from service.db_setup.db_settings import get_read_session, get_session
 from service.db_watchers import GameDb
 from service.schemas import (
+    LeaderboardRequest,
+    LeaderboardResponse,
+    PlayerRankResponse,
     QuestionGetOneRequest,
     QuestionIdResponse,
     QuestionResponse,
     ScoreResponse,
+    ScoresEditRequest,
+    ScoresResponse,
     TgPlayerIdRequest,
+    TgScoreRequest,
+    TurnRequest,
+    TurnResponse,
 )
-from service.utils import QuestionsManager
+from service.utils import GameManager, QuestionsManager
 
 api_router = APIRouter(
     prefix="/v1",
@@ -34,9 +42,10 @@ async def get_round_question(
 ) -> QuestionResponse:
     """Get_question next in round for this user."""
     q_manager = QuestionsManager(session)
-    db_game = GameDb(session)
     try:
-        await db_game.create_new_rounds(data.tg_id)
+        question_id = data.question_id or await GameManager(
+            session
+        ).next_round_question_id(data.tg_id)
     except IntegrityError as err:
         text_err = "error. maybe tg_id is wrong"
         logger.error(text_err)
@@ -44,15 +53,44 @@ async def get_round_question(
             status.HTTP_400_BAD_REQUEST,
             text_err,
         ) from err
-    question_id = data.question_id or await db_game.get_next_question_id(
-        data.tg_id
+    question = (
+        await q_manager.get_question_by_id(question_id) if question_id else None
     )
-    question = await q_manager.get_question_by_id(question_id)
     if question is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
     return question
 
 
+@api_router.post(
+    "/turn",
+    response_model=TurnResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Not found"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def play_turn(
+    data: TurnRequest, session: AsyncSession = Depends(get_session)
+) -> TurnResponse:
+    """Submit answer and advance: check the answer, raise score if
+    correct, mark the question asked and return the next question.
+    """
+    game_manager = GameManager(session)
+    try:
+        turn = await game_manager.submit_and_advance(data)
+    except IntegrityError as err:
+        text_err = "error. maybe tg_id is wrong"
+        logger.error(text_err)
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            text_err,
+        ) from err
+    if turn is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    return turn
+
+
 @api_router.post(
     "/round-question-id",
     response_model=QuestionIdResponse,
@@ -66,10 +104,10 @@ async def get_round_question_id(
     data: QuestionGetOneRequest, session: AsyncSession = Depends(get_session)
 ) -> QuestionIdResponse:
     """Get question_id next in round for this user."""
-    db_game = GameDb(session)
     try:
-        if not await db_game.get_next_question_id(data.tg_id):
-            await db_game.create_new_rounds(data.tg_id)
+        question_id = await GameManager(session).next_round_question_id(
+            data.tg_id
+        )
     except IntegrityError as err:
         text_err = "error. maybe tg_id is wrong"
         logger.error(text_err)
@@ -77,7 +115,6 @@ async def get_round_question_id(
             status.HTTP_400_BAD_REQUEST,
             text_err,
         ) from err
-    question_id = await db_game.get_next_question_id(data.tg_id)
     if question_id is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
     return QuestionIdResponse(question_id=question_id)
@@ -91,15 +128,35 @@ async def get_round_question_id(
     },
 )
 async def edit_player_score(
-    params=Depends(TgPlayerIdRequest),
+    params=Depends(TgScoreRequest),
     session: AsyncSession = Depends(get_session),
 ):
-    """Request for edit_score."""
+    """Request for edit_score. Adds delta (default 1) to the score."""
     db_game = GameDb(session)
-    score = await db_game.raise_score(params.tg_id)
+    score = await db_game.raise_score(params.tg_id, params.delta)
     return {"success": "1", "score": score}
 
 
+@api_router.put(
+    "/edit-scores",
+    response_model=ScoresResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def edit_players_scores(
+    data: ScoresEditRequest,
+    session: AsyncSession = Depends(get_session),
+):
+    """Request for edit_scores of many players in one statement."""
+    db_game = GameDb(session)
+    scores = await db_game.raise_scores(
+        (item.tg_id, item.delta) for item in data.items
+    )
+    return ScoresResponse(scores=scores)
+
+
 @api_router.post(
     "/player",
     responses={
@@ -127,7 +184,7 @@ async def add_player(
 )
 async def player_score(
     params=Depends(TgPlayerIdRequest),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Request for player_score."""
     db_game = GameDb(session)
@@ -137,6 +194,40 @@ async def player_score(
     return ScoreResponse(score=score)
 
 
+@api_router.get(
+    "/player-rank",
+    response_model=PlayerRankResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Not found"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def player_rank(
+    params=Depends(TgPlayerIdRequest),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Rank of the player by score, equal scores share a rank."""
+    rank = await GameManager(session).player_rank(params.tg_id)
+    if rank is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    return rank
+
+
+@api_router.get(
+    "/leaderboard",
+    response_model=LeaderboardResponse,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def leaderboard(
+    params: LeaderboardRequest = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Top players by score."""
+    return await GameManager(session).leaderboard(params.limit)
+
+
 @api_router.put(
     "/mark-answered",
     responses={
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+api_router = APIRouter(
+    prefix="",
+    tags=["private"],
+)
+
+
+@api_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Handler prometheus scrape."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
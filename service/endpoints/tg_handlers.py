@@ -1,9 +1,7 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, status
 
-from service.db_setup.db_settings import get_session
-from service.db_watchers import TgDb
 from service.schemas import TgUpdateIdRequest
+from service.utils import get_tg_update_id, store_tg_update_id
 
 api_router = APIRouter(
     prefix="",
@@ -18,13 +16,11 @@ api_router = APIRouter(
         status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
     },
 )
-async def put_update_id(
-    upd_data: TgUpdateIdRequest,
-    session: AsyncSession = Depends(get_session),
-):
-    """Handler update tg_id."""
-    tg_accessor = TgDb(session)
-    await tg_accessor.update_tg_id(upd_data.update_id)
+async def put_update_id(upd_data: TgUpdateIdRequest):
+    """Handler update tg_id. Never moves it back, saved in background
+    unless several workers share it.
+    """
+    await store_tg_update_id(upd_data.update_id)
     return {"success": "1"}
 
 
@@ -35,8 +31,7 @@ async def put_update_id(
         status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
     },
 )
-async def get_update_id(session: AsyncSession = Depends(get_session)):
-    """Handler get tg-update-id."""
-    tg_accessor = TgDb(session)
-    id_ = await tg_accessor.get_last_tg_id()
+async def get_update_id():
+    """Handler get tg-update-id, served from memory in one worker."""
+    id_ = await get_tg_update_id()
     return {"update_id": id_}
@@ -6,3 +6,20 @@ class AnswerNotAddedError(Exception):
 
     def __init__(self, err):
         self.add_detail = self.detail + f"{err.args}"
+
+
+class InvalidCursorError(ValueError):
+    detail: str = "Invalid cursor"
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.add_detail = f"{self.detail}: {reason}"
+
+
+class StatementBudgetExceededError(Exception):
+    detail: str = "Statement budget exceeded"
+
+    def __init__(self, route, limit: int, statements: list[str]):
+        super().__init__(route, limit)
+        self.statements = statements
+        self.add_detail = f"{self.detail}: {route} ran over {limit} statements"
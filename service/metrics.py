@@ -0,0 +1,165 @@
+"""Prometheus metrics of requests, sql statements and the connection pool.
+
+Statements are attributed to the `QuestionDb`/`AnswerDb`/`GameDb` method
+running them through a context variable, which sqlalchemy carries into
+the greenlet where cursor events fire.
+"""
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests being handled right now"
+)
+DB_METHOD_LATENCY = Histogram(
+    "db_method_duration_seconds",
+    "Latency of QuestionDb/AnswerDb/GameDb methods",
+    ["method"],
+)
+DB_STATEMENTS = Counter(
+    "db_statements_total", "Statements sent by db method", ["method"]
+)
+DB_STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "Cursor execute time of statements by db method",
+    ["method"],
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 20),
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out"
+)
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened above pool_size")
+POOL_WAITING = Gauge(
+    "db_pool_waiting", "Checkouts waiting for a free connection"
+)
+ADMISSION_REJECTED = Counter(
+    "http_admission_rejected_total",
+    "Requests turned away before the handler, see service/admission.py",
+    ["reason"],
+)
+
+NO_DB_METHOD = "-"
+db_method: ContextVar[str] = ContextVar("db_method", default=NO_DB_METHOD)
+
+
+def watch_db_methods(cls: type) -> type:
+    """Class decorator timing every public coroutine method and naming
+    the statements it sends.
+    """
+    for name, func in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(func):
+            continue
+        setattr(cls, name, _watched(func, f"{cls.__name__}.{name}"))
+    return cls
+
+
+def _watched(func, label: str):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = db_method.set(label)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            DB_METHOD_LATENCY.labels(label).observe(
+                time.perf_counter() - started
+            )
+            db_method.reset(token)
+
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, params, context, many):
+    context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, params, context, many):
+    started = context.metrics_started
+    label = db_method.get()
+    DB_STATEMENTS.labels(label).inc()
+    DB_STATEMENT_LATENCY.labels(label).observe(time.perf_counter() - started)
+
+
+def watch_engine(engine: AsyncEngine, pool_gauges: bool = True) -> None:
+    """Statement events and pool gauges of the engine in use. Gauges
+    follow one pool, so replicas only report statements.
+    """
+    sync_engine = engine.sync_engine
+    if not event.contains(
+        sync_engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        event.listen(
+            sync_engine, "before_cursor_execute", _before_cursor_execute
+        )
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    pool = sync_engine.pool
+    if pool_gauges and isinstance(pool, AsyncAdaptedQueuePool):
+        POOL_CHECKED_OUT.set_function(pool.checkedout)
+        POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
+        if isinstance(pool, TimedQueuePool):
+            POOL_WAITING.set_function(lambda: pool.waiting)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool reporting how long checkouts wait for a free connection and
+    how many are waiting right now.
+    """
+
+    waiting = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            self.waiting -= 1
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """Latency by route template and in-flight count of http requests."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                route.path if route else "unmatched",
+                status,
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,29 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+from service.errors import InvalidCursorError
+from service.schemas import QuestionOrderSchema
+
+
+def encode_cursor(order: QuestionOrderSchema, key: Any, id_: int) -> str:
+    """Opaque cursor of the last seen (order key, id)."""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([QuestionOrderSchema(order).value, key, id_])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, order: QuestionOrderSchema) -> tuple[Any, int]:
+    """(order key, id) from a cursor made for the same order."""
+    try:
+        cursor_order, key, id_ = json.loads(base64.urlsafe_b64decode(cursor))
+        if cursor_order != QuestionOrderSchema(order).value:
+            raise InvalidCursorError("cursor is for another order")
+        if cursor_order == QuestionOrderSchema.updated_dt.value:
+            key = datetime.fromisoformat(key)
+        return key, int(id_)
+    except (binascii.Error, ValueError, TypeError) as err:
+        raise InvalidCursorError(str(err)) from err
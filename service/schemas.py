@@ -4,6 +4,8 @@ from typing import Any
 
 from pydantic import BaseModel, Field, RootModel
 
+from service.config import LEADERBOARD_MAX_LIMIT, QUESTION_BATCH_MAX
+
 
 class UserInput(BaseModel):
     username: str
@@ -15,29 +17,57 @@ class QuestionOrderSchema(str, enum.Enum):  # noqa: UP042 enum.StrEnum for 3.11
     updated_dt = "updated_dt"
 
 
+class QuestionSearchSchema(str, enum.Enum):  # noqa: UP042 enum.StrEnum for 3.11
+    substring = "substring"
+    words = "words"
+
+
+class ExportFormatSchema(str, enum.Enum):  # noqa: UP042 enum.StrEnum for 3.11
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 class QuestionListRequest(BaseModel):
     question_id: int | None = Field(description="id of a question", default=0)
     text: str | None = Field(description="search by text", default=None)
+    search: QuestionSearchSchema | None = Field(
+        description="substring match or ranked words search (no cursor)",
+        default=QuestionSearchSchema.substring,
+    )
     active: int | None = Field(description="if question is active", default=1)
     order: QuestionOrderSchema | None = Field(
         description="order of results", default="id"
     )
     offset: int | None = Field(description="offset to show on page", default=0)
     limit: int | None = Field(description="limit to show on page", default=50)
+    cursor: str | None = Field(
+        description="next_cursor of the previous page, offset is ignored",
+        default=None,
+    )
 
     class Config:
         json_schema_extra = {
             "example": {
                 "text": "question",
+                "search": "substring",
                 "active": 1,
                 "id": None,
                 "order": "updated_dt",
                 "offset": 0,
                 "limit": 50,
+                "cursor": None,
             }
         }
 
 
+class QuizExportRequest(BaseModel):
+    active: int | None = Field(description="if question is active", default=1)
+    format: ExportFormatSchema = Field(
+        description="ndjson: question per line, csv: answer per line",
+        default=ExportFormatSchema.ndjson,
+    )
+
+
 class QuestionGetOneRequest(BaseModel):
     question_id: int | None = Field(description="id of a question", default=0)
     tg_id: int = Field(description="tg_id of a player")
@@ -139,6 +169,17 @@ class AnswerSubmitRequest(BaseModel):
         json_schema_extra = {"example": {"answer_ids": [1], "question_id": 1}}
 
 
+class TurnRequest(BaseModel):
+    tg_id: int = Field(description="tg_id of a player")
+    question_id: int = Field(description="id of the answered question")
+    answer_ids: list[int] = Field(min_length=1)
+
+    class Config:
+        json_schema_extra = {
+            "example": {"tg_id": 1, "question_id": 1, "answer_ids": [1]}
+        }
+
+
 class AnswerResponse(BaseModel):
     id: int = Field(description="id of an answer")
     text: str = Field(description="text")
@@ -160,6 +201,26 @@ class TgPlayerIdRequest(BaseModel):
     tg_id: int = Field(description="tg_id")
 
 
+class TgScoreRequest(BaseModel):
+    tg_id: int = Field(description="tg_id")
+    delta: int = Field(description="added to score", default=1)
+
+
+class ScoresEditRequest(BaseModel):
+    items: list[TgScoreRequest] = Field(min_length=1)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [{"tg_id": 1, "delta": 1}, {"tg_id": 2, "delta": -1}]
+            }
+        }
+
+
+class ScoresResponse(BaseModel):
+    scores: dict[int, int] = Field(description="tg_id: new score")
+
+
 class TgUpdateIdRequest(BaseModel):
     update_id: int = Field(description="update_id")
 
@@ -186,6 +247,26 @@ class ScoreResponse(BaseModel):
     score: int
 
 
+class LeaderboardRequest(BaseModel):
+    limit: int = Field(
+        description="players to show",
+        default=10,
+        ge=1,
+        le=LEADERBOARD_MAX_LIMIT,
+    )
+
+
+class PlayerRankResponse(BaseModel):
+    tg_id: int
+    score: int
+    rank: int = Field(description="1 + players with a higher score")
+
+
+class LeaderboardResponse(BaseModel):
+    players: list[PlayerRankResponse]
+    total: int = Field(description="players with a score")
+
+
 class QuestionIdResponse(BaseModel):
     question_id: int = Field(description="question_id")
 
@@ -197,6 +278,37 @@ class QuestionResponseInQuiz(BaseModel):
     answers: list[AnswerInResponse]
 
 
+class TurnResponse(BaseModel):
+    correct: bool
+    answers: list[AnswerInResponse] = Field(description="correct answers")
+    score: int | None
+    next_question: QuestionResponseInQuiz | None
+
+
+class QuestionBatchRequest(BaseModel):
+    ids: list[int] = Field(
+        description="question ids", min_length=1, max_length=QUESTION_BATCH_MAX
+    )
+
+    class Config:
+        json_schema_extra = {"example": {"ids": [3, 1, 2]}}
+
+
+class QuestionBatchResponse(BaseModel):
+    questions: list[QuestionResponseInQuiz] = Field(
+        description="found questions in the order of requested ids"
+    )
+    missing: list[int] = Field(description="requested ids not found")
+
+
+class QuestionStatsResponse(BaseModel):
+    question_id: int
+    attempts: int = Field(description="answers submitted")
+    correct: int = Field(description="correct ones of them")
+    correct_rate: float | None = Field(description="correct / attempts")
+    last_answered_dt: datetime | None
+
+
 class QuizResponse(RootModel):
     root: dict[int, QuestionResponseInQuiz]
 
@@ -221,3 +333,36 @@ class QuestionAddResponse(BaseModel):
                 "created": 1,
             }
         }
+
+
+class AnswerImportItem(BaseModel):
+    text: str = Field(description="text", min_length=1, max_length=50)
+    correct: bool = Field(description="if answer is correct")
+
+
+class QuestionImportItem(BaseModel):
+    text: str = Field(description="text", min_length=1, max_length=255)
+    active: int | None = Field(description="if question is active", default=1)
+    answers: list[AnswerImportItem] = Field(default_factory=list)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "text": "question1",
+                "active": 1,
+                "answers": [
+                    {"text": "answer 1", "correct": True},
+                    {"text": "answer 2", "correct": False},
+                ],
+            }
+        }
+
+
+class ImportItemError(BaseModel):
+    index: int = Field(description="position of the item in the body")
+    error: str
+
+
+class QuestionImportResponse(BaseModel):
+    created: int = Field(description="amount of created questions")
+    errors: list[ImportItemError]
@@ -0,0 +1,200 @@
+"""Per-request count of sql statements against a budget of the route.
+
+Catches N+1 regressions: a lazy load in a loop shows up as a route
+running far more statements than its budget. Enabled by
+STATEMENT_BUDGET_MODE ("log" or "raise"); tests use
+`assert_max_statements` / `assert_route_budget` whatever the mode.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from service.config import STATEMENT_BUDGET_MODE, logger
+from service.errors import StatementBudgetExceededError
+
+# (method, route template) -> max statements of one request
+ROUTE_STATEMENT_BUDGETS = {
+    # +1 for the ETag stamp when it is reloaded
+    ("GET", "/v1/quiz"): 3,
+    ("GET", "/v1/quiz/export"): 1,
+    ("GET", "/v1/questions"): 2,
+    ("POST", "/v1/questions/batch"): 2,
+    # writes of questions and answers +1 to bump the quiz revision
+    ("POST", "/v1/question"): 3,
+    ("POST", "/v1/questions/import"): 3,
+    ("GET", "/v1/question/{id_}/stats"): 1,
+    ("PATCH", "/v1/question/{id_}"): 3,
+    ("DELETE", "/v1/question/{id_}"): 2,
+    ("POST", "/v1/answer"): 3,
+    ("POST", "/v1/submit-answer"): 1,
+    ("DELETE", "/v1/answer/{id_}"): 3,
+    ("GET", "/v1/answer/{id_}"): 1,
+    # next question id of the rounds: 1 statement, a refill 4 (sampled
+    # insert, id pool reload, second lookup), a new cycle 7 (random_sort
+    # retry, delete, insert again); round-question +2 for the question
+    # and its answers, turn +3 to check, score and mark the answer
+    ("POST", "/v1/round-question"): 9,
+    ("POST", "/v1/turn"): 12,
+    ("POST", "/v1/round-question-id"): 7,
+    ("PUT", "/v1/edit-score"): 1,
+    ("PUT", "/v1/edit-scores"): 1,
+    ("POST", "/v1/player"): 1,
+    ("GET", "/v1/player-score"): 1,
+    # +1 when score_ranks is loaded, later reloads run in the background
+    ("GET", "/v1/player-rank"): 1,
+    ("GET", "/v1/leaderboard"): 2,
+    ("PUT", "/v1/mark-answered"): 1,
+    # written through with several workers, +2 to create the row
+    ("PUT", "/tg-update-id"): 3,
+    ("GET", "/tg-update-id"): 1,
+}
+# routes not listed above, e.g. import of many batches
+DEFAULT_STATEMENT_BUDGET = 10
+
+
+class StatementCounter:
+    """Statements run in one request or one `with` block."""
+
+    def __init__(self, limit: int | None = None, raise_over: bool = False):
+        self.limit = limit
+        self.raise_over = raise_over
+        self.route: tuple[str, str] | None = None
+        self.statements: list[str] = []
+        self._scope = None
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def bind(self, scope) -> None:
+        """Take the route of the asgi request once the router matched it."""
+        self._scope = scope
+
+    def resolve_route(self) -> None:
+        if self.route is not None or self._scope is None:
+            return
+        route = self._scope.get("route")
+        if route is None:
+            return
+        self.route = (self._scope["method"], route.path)
+        if self.limit is None:
+            self.limit = ROUTE_STATEMENT_BUDGETS.get(
+                self.route, DEFAULT_STATEMENT_BUDGET
+            )
+
+    def add(self, statement: str) -> None:
+        self.statements.append(statement)
+        self.resolve_route()
+        if (
+            self.raise_over
+            and self.limit is not None
+            and self.count > self.limit
+        ):
+            raise StatementBudgetExceededError(
+                self.route, self.limit, self.statements
+            )
+
+    @property
+    def over_budget(self) -> bool:
+        self.resolve_route()
+        return self.limit is not None and self.count > self.limit
+
+
+statement_counter: ContextVar[StatementCounter | None] = ContextVar(
+    "statement_counter", default=None
+)
+
+
+def _count_statement(conn, cursor, statement, params, context, many):
+    counter = statement_counter.get()
+    if counter is not None:
+        counter.add(statement)
+
+
+def watch_statement_budgets(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    if not event.contains(
+        sync_engine, "before_cursor_execute", _count_statement
+    ):
+        event.listen(sync_engine, "before_cursor_execute", _count_statement)
+
+
+@contextmanager
+def counting_statements(
+    limit: int | None = None, raise_over: bool = False
+) -> Iterator[StatementCounter]:
+    counter = StatementCounter(limit, raise_over)
+    token = statement_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        statement_counter.reset(token)
+
+
+@contextmanager
+def assert_max_statements(limit: int) -> Iterator[StatementCounter]:
+    """Test helper: fail if the block runs more than `limit` statements.
+
+    with assert_max_statements(2):
+        await client.get("/v1/quiz")
+    """
+    with counting_statements(limit) as counter:
+        yield counter
+    assert counter.count <= limit, (
+        f"{counter.count} statements, expected <= {limit}:\n"
+        + "\n".join(counter.statements)
+    )
+
+
+async def assert_route_budget(client, method: str, url: str, **kwargs):
+    """Test helper: one request through the app (httpx client with
+    ASGITransport), checked against ROUTE_STATEMENT_BUDGETS.
+    """
+    with counting_statements() as counter:
+        response = await client.request(method, url, **kwargs)
+    counter.resolve_route()
+    assert counter.route is not None, f"{method} {url} matched no route"
+    assert not counter.over_budget, (
+        f"{method} {counter.route[1]}: {counter.count} statements, "
+        f"budget {counter.limit}:\n" + "\n".join(counter.statements)
+    )
+    return response
+
+
+class StatementBudgetMiddleware:
+    """Counts statements of each http request against its route budget,
+    logs or raises when over it.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        counter = statement_counter.get()
+        if counter is not None:
+            # counted by a test helper
+            counter.bind(scope)
+            await self.app(scope, receive, send)
+            return
+        if STATEMENT_BUDGET_MODE not in {"log", "raise"}:
+            await self.app(scope, receive, send)
+            return
+        with counting_statements(
+            raise_over=STATEMENT_BUDGET_MODE == "raise"
+        ) as counter:
+            counter.bind(scope)
+            await self.app(scope, receive, send)
+        if counter.over_budget:
+            logger.warning(
+                "%s %s ran %s statements, budget %s",
+                *counter.route,
+                counter.count,
+                counter.limit,
+            )
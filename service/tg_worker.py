@@ -0,0 +1,301 @@
+"""In-process telegram bot: long-polls getUpdates and plays the quiz.
+
+One task polls the Bot API and puts updates on bounded queues (a full
+queue stops polling, so a slow database slows the bot instead of
+growing memory), one per each of TG_WORKER_HANDLERS tasks. The updates
+of a player always go to the same queue, so they are handled in order.
+A handler calls the game code directly, each update in its own session,
+and sends the replies once that session is committed and closed.
+
+The offset is the update id mark (see caches.UpdateIdMark), saved
+through TgDb. It only moves past updates that were handled, so after a
+crash getUpdates delivers the unhandled ones again; polls skip the
+updates still being handled. A database or Bot API failure that may
+pass (connection lost, pool timeout, 5xx) is retried with backoff, the
+committed part of an update is not redone; an update failing for good,
+e.g. a 4xx reply, is logged and passed over.
+
+Commands: /start registers the player, /question sends the next
+question with a button per answer, a button press checks the answer
+and sends the next one, /score sends the score.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from functools import partial
+from typing import TypeVar
+
+import httpx
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from service.caches import update_id_mark
+from service.config import (
+    TG_API_URL,
+    TG_POLL_TIMEOUT,
+    TG_QUEUE_SIZE,
+    TG_TOKEN,
+    TG_WORKER_HANDLERS,
+    logger,
+)
+from service.db_setup.db_settings import db_manager
+from service.db_setup.models import Question
+from service.db_watchers import GameDb
+from service.schemas import QuestionResponseInQuiz, TurnRequest
+from service.utils import GameManager, put_tg_update_id
+
+POLL_RETRY_DELAY = 1.0
+# doubled after every failed attempt up to the max
+HANDLE_RETRY_DELAY = 1.0
+HANDLE_RETRY_MAX_DELAY = 30.0
+
+
+Reply = tuple[str, dict]
+T = TypeVar("T")
+
+
+def is_transient(exc: Exception) -> bool:
+    """Failures an attempt later may not have."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(
+        exc,
+        sa_exc.OperationalError
+        | sa_exc.InterfaceError
+        | sa_exc.TimeoutError
+        | httpx.TransportError,
+    )
+
+
+class TgWorker:
+    def __init__(
+        self,
+        api_url: str = TG_API_URL,
+        token: str = TG_TOKEN,
+        handlers: int = TG_WORKER_HANDLERS,
+        queue_size: int = TG_QUEUE_SIZE,
+        poll_timeout: int = TG_POLL_TIMEOUT,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.base_url = f"{api_url.rstrip('/')}/bot{token}"
+        self.handlers = handlers
+        self.poll_timeout = poll_timeout
+        self.transport = transport
+        self.queues: list[asyncio.Queue[dict]] = [
+            asyncio.Queue(max(1, queue_size // handlers))
+            for _ in range(handlers)
+        ]
+        # update_id -> handled, in the order they were fetched
+        self._in_flight: dict[int, bool] = {}
+        self._progress = asyncio.Event()
+        self.client: httpx.AsyncClient | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.poll_timeout + 10,
+            transport=self.transport,
+        )
+        self._tasks = [asyncio.create_task(self._poll())]
+        self._tasks.extend(
+            asyncio.create_task(self._handle_forever(queue))
+            for queue in self.queues
+        )
+        logger.info("tg worker started with %s handlers", self.handlers)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def call(self, method: str, **params) -> dict | list:
+        response = await self.client.post(f"/{method}", json=params)
+        response.raise_for_status()
+        return response.json()["result"]
+
+    def _queue_of(self, update: dict) -> asyncio.Queue[dict]:
+        body = update.get("message") or update.get("callback_query") or {}
+        key = body.get("from", {}).get("id") or body.get("chat", {}).get("id")
+        return self.queues[(key or 0) % len(self.queues)]
+
+    def _handled(self, update_id: int) -> None:
+        """Advance the mark over the updates handled without a gap."""
+        self._in_flight[update_id] = True
+        mark = None
+        while self._in_flight:
+            first = next(iter(self._in_flight))
+            if not self._in_flight[first]:
+                break
+            del self._in_flight[first]
+            mark = first
+        if mark is not None:
+            put_tg_update_id(mark)
+        self._progress.set()
+
+    async def _poll(self) -> None:
+        while True:
+            offset = update_id_mark.value
+            # set by handlers from now on: nothing is missed while polling
+            self._progress.clear()
+            try:
+                updates = await self.call(
+                    "getUpdates",
+                    offset=offset + 1 if offset is not None else None,
+                    timeout=self.poll_timeout,
+                    allowed_updates=["message", "callback_query"],
+                )
+            except (httpx.HTTPError, KeyError, ValueError) as exc:
+                logger.error("getUpdates failed: %s", exc)
+                await asyncio.sleep(POLL_RETRY_DELAY)
+                continue
+            new = [
+                update
+                for update in updates
+                if update["update_id"] not in self._in_flight
+                and (offset is None or update["update_id"] > offset)
+            ]
+            if updates and not new:
+                # all of them are being handled, wait for one to finish
+                await self._progress.wait()
+                continue
+            for update in new:
+                self._in_flight[update["update_id"]] = False
+                await self._queue_of(update).put(update)
+
+    async def _retrying(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        delay = HANDLE_RETRY_DELAY
+        while True:
+            try:
+                return await attempt()
+            except Exception as exc:
+                if not is_transient(exc):
+                    raise
+                logger.warning("retrying in %ss: %s", delay, exc)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, HANDLE_RETRY_MAX_DELAY)
+
+    async def _commit(self, update: dict) -> list[Reply]:
+        async with db_manager.session_maker() as session:
+            replies = await self.handle(session, update)
+            await session.commit()
+        return replies
+
+    async def _handle_forever(self, queue: asyncio.Queue[dict]) -> None:
+        while True:
+            update = await queue.get()
+            try:
+                replies = await self._retrying(partial(self._commit, update))
+                # the connection is back in the pool during the Bot API calls
+                for method, params in replies:
+                    await self._retrying(partial(self.call, method, **params))
+            except Exception as exc:
+                logger.error(
+                    "update %s passed over: ",
+                    update.get("update_id"),
+                    exc_info=exc,
+                )
+            finally:
+                queue.task_done()
+            # not reached on cancellation: the update is delivered again
+            self._handled(update["update_id"])
+
+    async def handle(self, session: AsyncSession, update: dict) -> list[Reply]:
+        """Bot API calls to make once the session is committed."""
+        if "callback_query" in update:
+            return await self.on_answer(session, update["callback_query"])
+        message = update.get("message") or {}
+        text = (message.get("text") or "").strip()
+        chat_id = message.get("chat", {}).get("id")
+        tg_id = message.get("from", {}).get("id")
+        if chat_id is None or tg_id is None:
+            return []
+        if text.startswith("/start"):
+            await GameDb(session).create_player(tg_id)
+            return [
+                (
+                    "sendMessage",
+                    {"chat_id": chat_id, "text": "Send /question to play"},
+                )
+            ]
+        if text.startswith("/question"):
+            question = await GameManager(session).next_round_question(tg_id)
+            return [self.question_message(chat_id, question)]
+        if text.startswith("/score"):
+            score = await GameDb(session).get_score_of_player(tg_id)
+            return [
+                (
+                    "sendMessage",
+                    {"chat_id": chat_id, "text": f"Score: {score or 0}"},
+                )
+            ]
+        return []
+
+    async def on_answer(
+        self, session: AsyncSession, callback: dict
+    ) -> list[Reply]:
+        """Button data is "question_id:answer_id"."""
+        replies = [
+            ("answerCallbackQuery", {"callback_query_id": callback["id"]})
+        ]
+        chat_id = callback.get("message", {}).get("chat", {}).get("id")
+        try:
+            question_id, answer_id = map(int, callback["data"].split(":"))
+        except (KeyError, ValueError):
+            return replies
+        turn = await GameManager(session).submit_and_advance(
+            TurnRequest(
+                tg_id=callback["from"]["id"],
+                question_id=question_id,
+                answer_ids=[answer_id],
+            )
+        )
+        if turn is None:
+            replies.append(
+                ("sendMessage", {"chat_id": chat_id, "text": "Not found"})
+            )
+            return replies
+        correct = ", ".join(answer.text for answer in turn.answers)
+        replies.append(
+            (
+                "sendMessage",
+                {
+                    "chat_id": chat_id,
+                    "text": (
+                        f"{'Right' if turn.correct else 'Wrong'}! "
+                        f"Correct: {correct}. Score: {turn.score or 0}"
+                    ),
+                },
+            )
+        )
+        replies.append(self.question_message(chat_id, turn.next_question))
+        return replies
+
+    @staticmethod
+    def question_message(
+        chat_id: int, question: Question | QuestionResponseInQuiz | None
+    ) -> Reply:
+        if question is None:
+            return ("sendMessage", {"chat_id": chat_id, "text": "No questions"})
+        keyboard = [
+            [
+                {
+                    "text": answer.text,
+                    "callback_data": f"{question.id}:{answer.id}",
+                }
+            ]
+            for answer in question.answers
+        ]
+        return (
+            "sendMessage",
+            {
+                "chat_id": chat_id,
+                "text": question.text,
+                "reply_markup": {"inline_keyboard": keyboard},
+            },
+        )
@@ -1,7 +1,32 @@
+import asyncio
+import csv
+import hashlib
+import io
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Sequence
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import Row
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from service.config import logger
+from service.caches import (
+    CorrectAnswers,
+    answer_stats,
+    correct_answers_index,
+    quiz_version,
+    score_ranks,
+    update_id_mark,
+)
+from service.config import (
+    EXPORT_YIELD_PER,
+    IMPORT_BATCH_SIZE,
+    ROUND_SWEEP_BATCH,
+    ROUND_SWEEP_INTERVAL,
+    UPDATE_ID_IN_MEMORY,
+    logger,
+)
+from service.db_setup.db_settings import db_manager
 from service.db_setup.models import (
     Answer,
     # Player,
@@ -11,17 +36,57 @@ from service.db_setup.models import (
     # User,
 )
 from service.db_setup.schemas import AnswerDto, QuestionDto
-from service.db_watchers import AnswerDb, QuestionDb
+from service.db_watchers import AnswerDb, GameDb, QuestionDb, TgDb
+from service.pagination import encode_cursor
 from service.schemas import (
     AnswerInResponse,
     AnswerRequest,
     AnswerSubmitRequest,
+    ExportFormatSchema,
+    ImportItemError,
     IsCorrectAnsResponse,
+    LeaderboardResponse,
+    PlayerRankResponse,
     QuestionAddRequest,
+    QuestionImportItem,
+    QuestionImportResponse,
     QuestionListRequest,
+    QuestionOrderSchema,
     QuestionResponseInQuiz,
+    QuestionSearchSchema,
+    QuestionStatsResponse,
+    QuizExportRequest,
+    TurnRequest,
+    TurnResponse,
 )
 
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+async def as_async_iter(items: AsyncIterable | Iterable) -> AsyncIterator:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def dump_json(obj) -> bytes:
+    """Json of plain dicts/lists as pydantic would write it for the
+    response models (int keys as strings, utc datetimes with Z).
+    """
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+def validation_text(err: ValidationError) -> str:
+    """One line like 'answers.0.text: Field required; ...'."""
+    parts = []
+    for error in err.errors():
+        loc = ".".join(map(str, error["loc"]))
+        parts.append(f"{loc}: {error['msg']}" if loc else error["msg"])
+    return "; ".join(parts)
+
 
 class QuestionsManager:
     session = None
@@ -35,6 +100,48 @@ class QuestionsManager:
     async def remove_question(self, id_: int):
         return await QuestionDb(self.session).remove_question(id_)
 
+    async def _import_batch(
+        self,
+        batch: list[tuple[int, QuestionImportItem]],
+        errors: list[ImportItemError],
+    ) -> int:
+        ids = await QuestionDb(self.session).add_questions_with_answers(
+            [item for _, item in batch]
+        )
+        if ids is None:
+            errors.extend(
+                ImportItemError(index=index, error="batch not added")
+                for index, _ in batch
+            )
+            return 0
+        return len(ids)
+
+    async def import_questions(
+        self, raw_items: AsyncIterable[bytes] | Iterable[dict]
+    ) -> QuestionImportResponse:
+        """Validate items one by one, insert valid ones in batches."""
+        created, errors, batch = 0, [], []
+        index = 0
+        async for raw in as_async_iter(raw_items):
+            try:
+                if isinstance(raw, bytes):
+                    item = QuestionImportItem.model_validate_json(raw)
+                else:
+                    item = QuestionImportItem.model_validate(raw)
+            except ValidationError as err:
+                errors.append(
+                    ImportItemError(index=index, error=validation_text(err))
+                )
+            else:
+                batch.append((index, item))
+            index += 1
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                created += await self._import_batch(batch, errors)
+                batch = []
+        if batch:
+            created += await self._import_batch(batch, errors)
+        return QuestionImportResponse(created=created, errors=errors)
+
     async def edit_question_by_id(self, id_: int, vals: dict) -> int:
         # id_ = vals.pop("id")
         res = await QuestionDb(self.session).edit_question_by_id(id_, vals)
@@ -49,27 +156,140 @@ class QuestionsManager:
         question_id, user_ans_ids = params.question_id, params.answer_ids
         if not user_ans_ids:
             return None
+        correct = correct_answers_index.get(question_id)
+        if correct is None:
+            correct = await self._load_correct_answers(question_id)
+        is_correct = len(user_ans_ids) == len(correct.ids) and (
+            correct.ids == frozenset(user_ans_ids)
+        )
+        if correct.ids:
+            answer_stats.record(question_id, is_correct)
+        return correct.if_correct if is_correct else correct.if_wrong
+
+    async def _load_correct_answers(self, question_id: int) -> CorrectAnswers:
         corr_answers = await QuestionDb(self.session).find_correct_answers(
             question_id
         )
         if not corr_answers:
-            return None
-        is_correct = sorted([r.id for r in corr_answers]) == sorted(
-            user_ans_ids
-        )
-        return IsCorrectAnsResponse(
-            correct=is_correct,
-            answers=[
+            correct = CorrectAnswers(frozenset(), None, None)
+        else:
+            answers = [
                 AnswerInResponse(id=ans.id, text=ans.text, correct=ans.correct)
                 for ans in corr_answers
-            ],
-        )
+            ]
+            correct = CorrectAnswers(
+                frozenset(ans.id for ans in corr_answers),
+                IsCorrectAnsResponse(correct=True, answers=answers),
+                IsCorrectAnsResponse(correct=False, answers=answers),
+            )
+        correct_answers_index.put(question_id, correct)
+        return correct
 
     async def get_question_by_id(self, id_: int) -> QuestionDto | None:
         return await QuestionDb(self.session).get_question_by_id(id_)
 
-    async def get_questions(self, data: QuestionListRequest) -> list[Question]:
-        return await QuestionDb(self.session).get_questions(data)
+    async def get_answer_stats(
+        self, question_id: int
+    ) -> QuestionStatsResponse | None:
+        row = await QuestionDb(self.session).get_answer_stats(question_id)
+        if row is None:
+            return None
+        attempts, correct = row.attempts or 0, row.correct or 0
+        return QuestionStatsResponse(
+            question_id=row.id,
+            attempts=attempts,
+            correct=correct,
+            correct_rate=correct / attempts if attempts else None,
+            last_answered_dt=row.last_answered_dt,
+        )
+
+    @staticmethod
+    def next_cursor(
+        questions: Sequence[Row], data: QuestionListRequest
+    ) -> str | None:
+        """Cursor of the last question if the page is full."""
+        if not questions or not data.limit or len(questions) < data.limit:
+            return None
+        if data.text and data.search == QuestionSearchSchema.words:
+            return None
+        order = QuestionOrderSchema(data.order or QuestionOrderSchema.id)
+        last = questions[-1]
+        return encode_cursor(order, getattr(last, order.value), last.id)
+
+    @staticmethod
+    def questions_json(rows: Sequence[Row]) -> bytes:
+        """Body of list[QuestionResponse] serialized straight from rows."""
+        return dump_json([row._asdict() for row in rows])
+
+    @staticmethod
+    def quiz_dicts(
+        questions: Sequence[Row], answers: Sequence[Row]
+    ) -> dict[int, dict]:
+        """Plain QuestionResponseInQuiz dicts by id, answers rows ordered
+        by question_id.
+        """
+        quiz = {
+            row.id: {
+                "id": row.id,
+                "text": row.text,
+                "active": row.active,
+                "answers": [],
+            }
+            for row in questions
+        }
+        for row in answers:
+            quiz[row.question_id]["answers"].append(
+                {"id": row.id, "text": row.text, "correct": row.correct}
+            )
+        return quiz
+
+    @classmethod
+    def quiz_json(
+        cls, questions: Sequence[Row], answers: Sequence[Row]
+    ) -> bytes:
+        """Body of QuizResponse serialized straight from rows."""
+        return dump_json(cls.quiz_dicts(questions, answers))
+
+    async def get_questions_batch_json(self, ids: list[int]) -> bytes:
+        """Body of QuestionBatchResponse: found questions in the order of
+        ids (repeated ids once), missing ids listed.
+        """
+        ids = list(dict.fromkeys(ids))
+        questions, answers = await QuestionDb(
+            self.session
+        ).get_quiz_rows_by_ids(ids)
+        found = self.quiz_dicts(questions, answers)
+        return dump_json(
+            {
+                "questions": [found[id_] for id_ in ids if id_ in found],
+                "missing": [id_ for id_ in ids if id_ not in found],
+            }
+        )
+
+    async def get_questions_json(
+        self, data: QuestionListRequest
+    ) -> tuple[bytes, str | None]:
+        rows = await QuestionDb(self.session).get_question_rows(data)
+        return self.questions_json(rows), self.next_cursor(rows, data)
+
+    async def listing_etag(self, url: str) -> str:
+        """Strong ETag of a listing page: the quiz version stamp and the
+        url with its query, so every page has its own.
+        """
+        stamp = await quiz_version.get(QuestionDb(self.session).get_quiz_stamp)
+        digest = hashlib.blake2b(
+            f"{stamp}\n{url}".encode(), digest_size=16
+        ).hexdigest()
+        return f'"{digest}"'
+
+    async def get_quiz_json(
+        self, data: QuestionListRequest
+    ) -> tuple[bytes, str | None]:
+        questions, answers = await QuestionDb(self.session).get_quiz_rows(data)
+        return (
+            self.quiz_json(questions, answers),
+            self.next_cursor(questions, data),
+        )
 
     def convert_quiz_response(self, res) -> dict:
         responses = {}
@@ -90,12 +310,57 @@ class QuestionsManager:
                 )
         return responses
 
-    async def get_questions_with_answers(
-        self, data: QuestionListRequest
-    ) -> dict:
-        res = await QuestionDb(self.session).get_questions_with_answers(data)
-        responses = self.convert_quiz_response(res)
-        return responses
+    async def _export_ndjson(
+        self, rows: AsyncIterator[Row]
+    ) -> AsyncIterator[str]:
+        lines, question = [], None
+        async for row in rows:
+            if question is None or question.id != row.id:
+                if question is not None:
+                    lines.append(question.model_dump_json() + "\n")
+                question = QuestionResponseInQuiz(
+                    id=row.id, text=row.text, active=row.active, answers=[]
+                )
+            if row.answer_id is not None:
+                question.answers.append(
+                    AnswerInResponse(
+                        id=row.answer_id,
+                        text=row.answer_text,
+                        correct=row.correct,
+                    )
+                )
+            if len(lines) >= EXPORT_YIELD_PER:
+                yield "".join(lines)
+                lines = []
+        if question is not None:
+            lines.append(question.model_dump_json() + "\n")
+        if lines:
+            yield "".join(lines)
+
+    async def _export_csv(self, rows: AsyncIterator[Row]) -> AsyncIterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(
+            ("question_id", "text", "active", "answer_id", "answer", "correct")
+        )
+        async for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def export_quiz(self, data: QuizExportRequest) -> AsyncIterator[str]:
+        """Chunks of all questions with answers, memory does not grow
+        with the amount of questions.
+        """
+        rows = QuestionDb(self.session).stream_questions_with_answers(
+            data.active
+        )
+        if data.format == ExportFormatSchema.csv:
+            return self._export_csv(rows)
+        return self._export_ndjson(rows)
 
 
 class AnswersManager:
@@ -129,10 +394,155 @@ class AnswersManager:
         )
 
 
-"""
 class GameManager:
     session = None
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
-"""
+
+    async def next_round_question_id(self, user_tg_id: int) -> int | None:
+        """Next unasked question of the player. Rounds are refilled only
+        when none is left, from the start when every question was asked.
+        """
+        db_game = GameDb(self.session)
+        question_id = await db_game.get_next_question_id(user_tg_id)
+        if question_id is not None:
+            return question_id
+        if not await db_game.create_new_rounds(user_tg_id):
+            await db_game.delete_old_rounds(user_tg_id)
+            await db_game.create_new_rounds(user_tg_id)
+        return await db_game.get_next_question_id(user_tg_id)
+
+    async def next_round_question(self, user_tg_id: int) -> Question | None:
+        question_id = await self.next_round_question_id(user_tg_id)
+        if question_id is None:
+            return None
+        return await QuestionDb(self.session).get_question_by_id(question_id)
+
+    async def sweep_asked_rounds(self, batch: int) -> int:
+        """Delete asked rounds batch by batch, each in its own commit."""
+        deleted = 0
+        while True:
+            count = await GameDb(self.session).sweep_asked_rounds(batch)
+            await self.session.commit()
+            deleted += count
+            if count < batch:
+                return deleted
+
+    async def player_rank(self, user_tg_id: int) -> PlayerRankResponse | None:
+        """Rank from score_ranks, reloaded from the table when stale."""
+        await score_ranks.load(load_all_scores)
+        found = score_ranks.rank(user_tg_id)
+        if found is None:
+            return None
+        rank, score = found
+        return PlayerRankResponse(tg_id=user_tg_id, score=score, rank=rank)
+
+    async def leaderboard(self, limit: int) -> LeaderboardResponse:
+        top = await GameDb(self.session).get_leaderboard(limit)
+        await score_ranks.load(load_all_scores)
+        players = [
+            PlayerRankResponse(
+                tg_id=tg_id, score=score, rank=score_ranks.rank_of_score(score)
+            )
+            for tg_id, score in top
+        ]
+        return LeaderboardResponse(players=players, total=len(score_ranks))
+
+    async def submit_and_advance(
+        self, data: TurnRequest
+    ) -> TurnResponse | None:
+        """Check answer, raise score, mark asked and get next question,
+        all in the one transaction of the session.
+        """
+        q_manager = QuestionsManager(self.session)
+        checked = await q_manager.compare_correct_answers(
+            AnswerSubmitRequest(
+                question_id=data.question_id, answer_ids=data.answer_ids
+            )
+        )
+        if checked is None:
+            return None
+        db_game = GameDb(self.session)
+        if checked.correct:
+            score = await db_game.raise_score(data.tg_id)
+        else:
+            score = await db_game.get_score_of_player(data.tg_id)
+        await db_game.mark_question_answered(data.question_id, data.tg_id)
+        question = await self.next_round_question(data.tg_id)
+        return TurnResponse(
+            correct=checked.correct,
+            answers=checked.answers,
+            score=score,
+            next_question=(
+                q_manager.convert_quiz_response([question])[question.id]
+                if question
+                else None
+            ),
+        )
+
+
+async def load_all_scores() -> list[tuple[int, int]]:
+    """Own session, score_ranks may reload after the request is done."""
+    async with db_manager.read_session() as session:
+        return list(await GameDb(session).get_all_scores())
+
+
+async def load_tg_update_id() -> int | None:
+    async with db_manager.session_maker() as session:
+        return await TgDb(session).get_last_tg_id()
+
+
+async def save_tg_update_id(id_: int) -> None:
+    async with db_manager.session_maker() as session:
+        await TgDb(session).update_tg_id(id_)
+        await session.commit()
+
+
+async def save_answer_stats(rows: list[dict]) -> None:
+    async with db_manager.session_maker() as session:
+        await QuestionDb(session).add_answer_stats(rows)
+        await session.commit()
+
+
+async def get_tg_update_id() -> int | None:
+    """From memory, read from the table once if not restored yet. From
+    the table with several workers, whichever of them got the last put.
+    """
+    if not UPDATE_ID_IN_MEMORY:
+        return await load_tg_update_id()
+    if not update_id_mark.restored:
+        await update_id_mark.restore(load_tg_update_id)
+    return update_id_mark.value
+
+
+def put_tg_update_id(id_: int) -> int:
+    """Raise the mark in memory, the flusher saves it."""
+    update_id_mark.start(save_tg_update_id)
+    return update_id_mark.advance(id_)
+
+
+async def store_tg_update_id(id_: int) -> None:
+    """put_tg_update_id in one worker, straight to the table with several."""
+    if UPDATE_ID_IN_MEMORY:
+        put_tg_update_id(id_)
+    else:
+        await save_tg_update_id(id_)
+
+
+async def sweep_rounds_forever(
+    interval: float = ROUND_SWEEP_INTERVAL, batch: int = ROUND_SWEEP_BATCH
+) -> None:
+    """Background purge of the asked rounds of players who went through
+    every question, so `round` holds at most one cycle per player.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with db_manager.session_maker() as session:
+                deleted = await GameManager(session).sweep_asked_rounds(batch)
+        except Exception as exc:
+            logger.error("rounds not swept: ", exc_info=exc)
+            continue
+        if deleted:
+            logger.info("swept %s asked rounds", deleted)
@@ -0,0 +1,73 @@
+"""Tests run on an in-process sqlite database, no server needed.
+
+TEST_DB_URL points them to another database, e.g. a scratch postgres for
+the concurrency tests. Tables are created from the models before every
+test and dropped after it.
+"""
+
+import os
+
+os.environ.setdefault("KEY", "test")
+os.environ["DB_URL"] = os.environ.get("TEST_DB_URL", "sqlite+aiosqlite://")
+os.environ["DB_REPLICA_URLS"] = ""
+os.environ["ROUND_SWEEP_INTERVAL"] = "0"
+os.environ["STATEMENT_BUDGET_MODE"] = "off"
+os.environ["TG_WORKER"] = "False"
+
+import httpx
+import pytest_asyncio
+
+from service.__main__ import app  # noqa: PLC2701
+from service.caches import (
+    active_question_ids,
+    answer_stats,
+    correct_answers_index,
+    quiz_version,
+    score_ranks,
+    update_id_mark,
+)
+from service.db_setup.db_settings import db_manager
+from service.db_setup.models import Base
+
+
+def reset_caches() -> None:
+    """Process-local caches are module singletons: start every test with
+    empty ones, their locks and tasks bound to the loop of the test.
+    """
+    for cache, args in (
+        (active_question_ids, (active_question_ids.ttl,)),
+        (
+            correct_answers_index,
+            (correct_answers_index.maxsize, correct_answers_index.ttl),
+        ),
+        (score_ranks, (score_ranks.ttl,)),
+        (quiz_version, (quiz_version.ttl,)),
+        (update_id_mark, (update_id_mark.interval,)),
+        (answer_stats, (answer_stats.interval, answer_stats.enabled)),
+    ):
+        cache.__init__(*args)  # noqa: PLC2801
+
+
+@pytest_asyncio.fixture
+async def db():
+    reset_caches()
+    await db_manager.create_tables()
+    yield db_manager
+    async with db_manager.get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await db_manager.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(db):
+    async with db.session_maker() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        yield client
@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+import sqlalchemy as sa
+
+from service.db_setup.dialects import dialect_of, get_dialect
+from service.db_setup.models import QuestionStats, User
+from service.db_watchers import GameDb, QuestionDb, UserDb
+from service.schemas import QuestionImportItem
+
+
+def test_unknown_dialect():
+    with pytest.raises(ValueError, match="unsupported database"):
+        get_dialect("oracle")
+
+
+async def test_dialect_of_session(session):
+    dialect = dialect_of(session)
+    assert dialect.name == session.get_bind().dialect.name
+    assert await session.scalar(sa.select(dialect.random())) is not None
+
+
+async def test_create_player_once(session):
+    assert await GameDb(session).create_player(7) is not None
+    assert await GameDb(session).create_player(7) is None
+    await session.commit()
+    assert await GameDb(session).get_score_of_player(7) == 0
+
+
+async def test_put_user_once(session):
+    assert await UserDb(User).put(session, "ann", "secret") is not None
+    assert await UserDb(User).put(session, "ann", "other") is None
+
+
+async def test_answer_stats_upsert_adds_up(session):
+    first = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+    rows = [
+        {
+            "question_id": 1,
+            "attempts": 3,
+            "correct": 1,
+            "last_answered_dt": first,
+        }
+    ]
+    await QuestionDb(session).add_answer_stats(rows)
+    rows[0]["last_answered_dt"] = first - datetime.timedelta(days=1)
+    await QuestionDb(session).add_answer_stats(rows)
+    await session.commit()
+    stats = await session.get(QuestionStats, 1)
+    assert (stats.attempts, stats.correct) == (6, 2)
+    assert stats.last_answered_dt.replace(tzinfo=datetime.UTC) == first
+
+
+async def test_rounds_skip_queued_questions(session):
+    await QuestionDb(session).add_questions_with_answers(
+        [QuestionImportItem(text=f"q{i}", answers=[]) for i in range(3)]
+    )
+    await GameDb(session).create_player(7)
+    assert await GameDb(session).create_new_rounds(7, amount=2) == 2
+    assert await GameDb(session).create_new_rounds(7, amount=2) == 1
+    assert await GameDb(session).create_new_rounds(7, amount=2) == 0
+    questions = await session.scalar(
+        sa.text("SELECT count(DISTINCT question_id) FROM round")
+    )
+    assert questions == 3
+
+
+async def test_answer_stats_upserted_in_question_order(session, monkeypatch):
+    question_db = QuestionDb(session)
+    upsert, batches = question_db.dialect.upsert, []
+
+    def recording_upsert(model, rows, *args):
+        batches.append([row["question_id"] for row in rows])
+        return upsert(model, rows, *args)
+
+    monkeypatch.setattr(question_db.dialect, "upsert", recording_upsert)
+    monkeypatch.setattr("service.db_watchers.ANSWER_STATS_BATCH_SIZE", 2)
+    now = datetime.datetime.now(tz=datetime.UTC)
+    await question_db.add_answer_stats(
+        [
+            {
+                "question_id": id_,
+                "attempts": 1,
+                "correct": 0,
+                "last_answered_dt": now,
+            }
+            for id_ in (5, 1, 4, 2, 3)
+        ]
+    )
+    assert batches == [[1, 2], [3, 4], [5]]
@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+
+import orjson
+import pytest
+import sqlalchemy as sa
+
+from service.db_setup.models import Answer, Question
+from service.schemas import QuizExportRequest
+from service.utils import QuestionsManager
+
+QUESTIONS = 500_000
+SEED_BATCH = 50_000
+STATM = Path("/proc/self/statm")
+
+
+def rss() -> int:
+    return int(STATM.read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def seed(session, amount: int) -> None:
+    for start in range(0, amount, SEED_BATCH):
+        ids = range(start + 1, min(start + SEED_BATCH, amount) + 1)
+        await session.execute(
+            sa.insert(Question),
+            [
+                {"id": id_, "text": f"question {id_}", "active": 1}
+                for id_ in ids
+            ],
+        )
+        await session.execute(
+            sa.insert(Answer),
+            [
+                {"text": f"answer {id_}", "correct": True, "question_id": id_}
+                for id_ in ids
+            ],
+        )
+    await session.commit()
+
+
+@pytest.mark.skipif(not STATM.exists(), reason="reads rss from /proc")
+async def test_export_memory_stays_flat(session):
+    """The export is streamed: after the first chunks, rss does not grow
+    with the questions still to come.
+    """
+    await seed(session, QUESTIONS)
+    exported = lines = 0
+    baseline = peak = None
+    async for chunk in QuestionsManager(session).export_quiz(
+        QuizExportRequest()
+    ):
+        exported += len(chunk)
+        lines += chunk.count("\n")
+        if baseline is None and lines >= QUESTIONS // 10:
+            baseline = peak = rss()
+        elif baseline is not None:
+            peak = max(peak, rss())
+        last = chunk
+
+    assert lines == QUESTIONS
+    assert orjson.loads(last.splitlines()[-1])["id"] == QUESTIONS
+    growth = peak - baseline
+    assert growth < exported / 10, (growth, exported)
@@ -0,0 +1,30 @@
+import asyncio
+
+from service import __main__ as main
+from service.caches import update_id_mark
+from service.db_setup.db_settings import db_manager
+
+
+async def test_shutdown_survives_failed_flush(db, monkeypatch):
+    async def failing_save(update_id: int) -> None:  # noqa: RUF029
+        raise ConnectionError("database gone")
+
+    swept = asyncio.Event()
+
+    async def sweep_forever() -> None:
+        try:
+            await asyncio.Event().wait()
+        finally:
+            swept.set()
+
+    monkeypatch.setattr(main, "save_tg_update_id", failing_save)
+    monkeypatch.setattr(main, "ROUND_SWEEP_INTERVAL", 1)
+    monkeypatch.setattr(main, "sweep_rounds_forever", sweep_forever)
+    async with main.lifespan(main.app):
+        # the sweeper is running, not only scheduled
+        await asyncio.sleep(0)
+        update_id_mark.advance(5)
+
+    # the sweeper was awaited, the engine disposed after the failed save
+    assert swept.is_set()
+    assert db_manager.engine is None
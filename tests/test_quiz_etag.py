@@ -0,0 +1,89 @@
+import sqlalchemy as sa
+
+from service.config import utcnow
+from service.db_setup.dialects import utc_now
+from service.db_setup.models import Question
+from service.db_watchers import QuestionDb
+from service.schemas import QuestionImportItem
+from service.statement_budget import assert_max_statements
+
+QUESTIONS = [
+    {"text": f"q{n}", "answers": [{"text": "a", "correct": True}]}
+    for n in range(3)
+]
+
+
+async def stamp(db) -> tuple:
+    async with db.session_maker() as session:
+        return await QuestionDb(session).get_quiz_stamp()
+
+
+async def test_repeated_listing_is_not_modified(client):
+    await client.post("/v1/questions/import", json=QUESTIONS)
+    response = await client.get("/v1/quiz")
+    etag = response.headers["etag"]
+
+    with assert_max_statements(0):
+        response = await client.get("/v1/quiz", headers={"if-none-match": etag})
+    assert response.status_code == 304
+
+    await client.post(
+        "/v1/answer", json={"text": "b", "correct": False, "question_id": 1}
+    )
+    response = await client.get("/v1/quiz", headers={"if-none-match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+async def test_stamp_moves_with_every_change(db, client):
+    await client.post("/v1/questions/import", json=QUESTIONS)
+    stamps = [await stamp(db)]
+    for method, url, kwargs in (
+        ("post", "/v1/question", {"json": {"text": "q3"}}),
+        # an edit within the second of the import
+        ("patch", "/v1/question/1", {"params": {"text": "edited"}}),
+        (
+            "post",
+            "/v1/answer",
+            {"json": {"text": "c", "correct": True, "question_id": 1}},
+        ),
+        ("delete", "/v1/answer/4", {}),
+        # the id of the deleted answer again, on sqlite without
+        # AUTOINCREMENT: the same ids and counts as before the delete
+        (
+            "post",
+            "/v1/answer",
+            {"json": {"text": "c", "correct": True, "question_id": 1}},
+        ),
+        ("delete", "/v1/question/4", {}),
+    ):
+        response = await client.request(method, url, **kwargs)
+        assert response.is_success, (method, url)
+        stamps.append(await stamp(db))
+    assert len(set(stamps)) == len(stamps)
+
+
+async def test_stamp_is_one_lookup(session):
+    with assert_max_statements(1):
+        assert await QuestionDb(session).get_quiz_stamp() == (0,)
+
+
+async def test_rolled_back_change_keeps_stamp(db, session):
+    before = await stamp(db)
+    await QuestionDb(session).bump_quiz_revision()
+    await session.rollback()
+    assert await stamp(db) == before
+
+
+async def test_server_side_now_has_microseconds(session):
+    """Sorts with the datetimes sqlalchemy stores as text on sqlite."""
+    started = utcnow().replace(microsecond=0)
+    await QuestionDb(session).add_questions_with_answers(
+        [QuestionImportItem(text="q", answers=[])]
+    )
+    await session.execute(sa.update(Question).values(updated_dt=utc_now()))
+    raw = await session.scalar(sa.text("SELECT updated_dt FROM question"))
+    stored = await session.scalar(sa.select(Question.updated_dt))
+    if session.get_bind().dialect.name == "sqlite":
+        assert len(raw) == len("2026-01-01 00:00:00.000000")
+    assert stored.replace(tzinfo=started.tzinfo) >= started
@@ -0,0 +1,78 @@
+import pytest_asyncio
+import sqlalchemy as sa
+
+from service.config import db_settings
+from service.db_setup import db_settings as db_settings_module
+from service.db_setup.db_settings import DBManager
+from service.db_setup.models import Answer, Base, Player, Question
+
+CLIENT = {"X-Client-Id": "a"}
+OTHER_CLIENT = {"X-Client-Id": "b"}
+
+
+@pytest_asyncio.fixture
+async def replicated(db, tmp_path, monkeypatch):
+    """Primary and replica in two sqlite files; the replica never gets
+    the primary's rows, like one lagging far behind.
+    """
+    manager = DBManager(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+    )
+    await manager.create_tables()
+    (replica_maker,) = manager.replica_session_makers
+    async with replica_maker.kw["bind"].begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(db_settings_module, "db_manager", manager)
+    monkeypatch.setitem(db_settings, "read_your_writes", 60)
+    yield manager
+    await manager.dispose()
+
+
+async def test_reads_go_to_replica(replicated):
+    async with replicated.session_maker() as session:
+        session.add(Player(tg_id=1, score=0))
+        await session.commit()
+    async with replicated.read_session() as session:
+        assert await session.scalar(sa.select(sa.func.count(Player.id))) == 0
+    async with replicated.read_session("a") as session:
+        assert await session.scalar(sa.select(sa.func.count(Player.id))) == 0
+    replicated.wrote("a")
+    async with replicated.read_session("a") as session:
+        assert await session.scalar(sa.select(sa.func.count(Player.id))) == 1
+
+
+async def test_only_writes_read_from_primary(replicated, client):
+    async with replicated.session_maker() as session:
+        question = Question(text="q")
+        session.add(question)
+        await session.flush()
+        session.add(Answer(text="a", correct=True, question_id=question.id))
+        session.add(Player(tg_id=1, score=0))
+        await session.commit()
+
+    # a POST that only reads does not send the client's reads to primary
+    response = await client.post(
+        "/v1/submit-answer",
+        params={"question_id": 1},
+        json=[1],
+        headers=CLIENT,
+    )
+    assert response.status_code == 200
+    response = await client.get(
+        "/v1/player-score", params={"tg_id": 1}, headers=CLIENT
+    )
+    assert response.status_code == 404
+
+    response = await client.put(
+        "/v1/edit-score", params={"tg_id": 1}, headers=CLIENT
+    )
+    assert response.json()["score"] == 1
+    response = await client.get(
+        "/v1/player-score", params={"tg_id": 1}, headers=CLIENT
+    )
+    assert response.json() == {"score": 1}
+    response = await client.get(
+        "/v1/player-score", params={"tg_id": 1}, headers=OTHER_CLIENT
+    )
+    assert response.status_code == 404
@@ -0,0 +1,192 @@
+import asyncio
+
+import sqlalchemy as sa
+
+from service.caches import ActiveQuestionIds, active_question_ids
+from service.db_setup.models import Rounds
+from service.db_watchers import GameDb, QuestionDb
+from service.schemas import QuestionAddRequest, QuestionImportItem
+from service.utils import GameManager
+
+QUESTIONS = 12
+PLAYERS = 6
+CYCLES = 4
+
+
+async def seed(session, questions: int, players: int) -> dict[int, int]:
+    """Questions with one right and one wrong answer, and players 1..n.
+    Returns question id -> right answer id.
+    """
+    ids = await QuestionDb(session).add_questions_with_answers(
+        [
+            QuestionImportItem(
+                text=f"q{n}",
+                answers=[
+                    {"text": "right", "correct": True},
+                    {"text": "wrong", "correct": False},
+                ],
+            )
+            for n in range(questions)
+        ]
+    )
+    for tg_id in range(1, players + 1):
+        await GameDb(session).create_player(tg_id)
+    right = {}
+    for id_ in ids:
+        (answer,) = await QuestionDb(session).find_correct_answers(id_)
+        right[id_] = answer.id
+    # gives the connection back, the in-memory database has only one
+    await session.commit()
+    return right
+
+
+async def count_rounds(session) -> int:
+    return await session.scalar(sa.select(sa.func.count(Rounds.id)))
+
+
+async def play(client, tg_id: int, right: dict[int, int]) -> list[int]:
+    """Ids of the questions served to the player, in order."""
+    response = await client.post("/v1/round-question-id", json={"tg_id": tg_id})
+    served = [response.json()["question_id"]]
+    for _ in range(QUESTIONS * CYCLES - 1):
+        response = await client.post(
+            "/v1/turn",
+            json={
+                "tg_id": tg_id,
+                "question_id": served[-1],
+                "answer_ids": [right[served[-1]]],
+            },
+        )
+        assert response.status_code == 200, response.text
+        served.append(response.json()["next_question"]["id"])
+    return served
+
+
+async def test_round_stays_bounded_without_repeats(db, session, client):
+    right = await seed(session, QUESTIONS, PLAYERS)
+    stop = asyncio.Event()
+
+    async def sweep() -> int:
+        peak = 0
+        while not stop.is_set():
+            async with db.session_maker() as sweeper:
+                await GameManager(sweeper).sweep_asked_rounds(batch=3)
+                peak = max(peak, await count_rounds(sweeper))
+            await asyncio.sleep(0)
+        return peak
+
+    sweeper = asyncio.create_task(sweep())
+    served = await asyncio.gather(
+        *(play(client, tg_id, right) for tg_id in range(1, PLAYERS + 1))
+    )
+    stop.set()
+    peak = await sweeper
+
+    # every question once per cycle, whatever the sweeper deleted
+    for questions in served:
+        for start in range(0, len(questions), QUESTIONS):
+            cycle = questions[start : start + QUESTIONS]
+            assert sorted(cycle) == sorted(right)
+    # at most one cycle of rounds per player, however many were played
+    assert peak <= PLAYERS * QUESTIONS
+    assert await count_rounds(session) <= PLAYERS * QUESTIONS
+
+
+async def test_sweep_keeps_history_of_unfinished_players(session):
+    await seed(session, 3, 2)
+    game = GameDb(session)
+    for tg_id, asked in ((1, 3), (2, 2)):
+        await game.create_new_rounds(tg_id, amount=asked)
+        await session.execute(
+            sa.update(Rounds)
+            .where(Rounds.player_id == tg_id)
+            .values(asked=True)
+        )
+    await session.commit()
+
+    assert await GameManager(session).sweep_asked_rounds(batch=10) == 3
+    players = await session.scalars(sa.select(Rounds.player_id))
+    assert list(players) == [2, 2]
+
+
+async def test_missed_sample_does_not_reset_history(session, monkeypatch):
+    right = await seed(session, 10, 1)
+    game = GameDb(session)
+    await game.create_new_rounds(1, amount=9, sampling="random_sort")
+    await session.execute(sa.update(Rounds).values(asked=True))
+    asked = set(await session.scalars(sa.select(Rounds.question_id)))
+    (left,) = set(right) - asked
+
+    async def sample_asked(loader, reloader, amount):  # noqa: RUF029
+        return sorted(asked)[:amount]
+
+    monkeypatch.setattr(active_question_ids, "sample", sample_asked)
+    question_id = await GameManager(session).next_round_question_id(1)
+
+    assert question_id == left
+    assert await count_rounds(session) == 10
+
+
+async def test_stale_ids_reload_in_background():
+    ids = ActiveQuestionIds(ttl=0)
+    table = [1, 2]
+    reloading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def loader():  # noqa: RUF029
+        return list(table)
+
+    async def reloader():
+        loaded = list(table)
+        reloading.set()
+        await release.wait()
+        return loaded
+
+    assert sorted(await ids.get(loader, reloader)) == [1, 2]
+
+    table.extend([3, 4])
+    # stale: the old ids serve while the table is read
+    assert sorted(await ids.get(loader, reloader)) == [1, 2]
+    await reloading.wait()
+    # committed meanwhile, one of them after the table was read
+    table.remove(1)
+    ids.discard(1)
+    table.append(5)
+    ids.add(5)
+    ids.discard(3)
+    table.remove(3)
+    assert sorted(await ids.get(loader, reloader)) == [2, 5]
+
+    reload = ids._task
+    release.set()
+    await reload
+    assert sorted(await ids.get(loader, reloader)) == [2, 4, 5]
+
+
+async def test_question_changes_update_ids(session):
+    async def failing_loader():  # noqa: RUF029
+        raise AssertionError("loaded again")
+
+    question_db = QuestionDb(session)
+    (first,) = await question_db.add_questions_with_answers(
+        [QuestionImportItem(text="q", answers=[])]
+    )
+    assert list(
+        await active_question_ids.get(
+            question_db.get_active_question_ids, failing_loader
+        )
+    ) == [first]
+
+    second = await question_db.add_question(QuestionAddRequest(text="q2"))
+    inactive = await question_db.add_question(
+        QuestionAddRequest(text="q3", active=0)
+    )
+    await question_db.edit_question_by_id(first, {"active": 0})
+    await question_db.edit_question_by_id(inactive, {"active": 1})
+    await question_db.edit_question_by_id(inactive, {"text": "still"})
+    await question_db.remove_question(second)
+
+    # the first array is kept current, nothing is reloaded
+    ids = await active_question_ids.get(failing_loader, failing_loader)
+    assert list(ids) == [inactive]
+    assert sorted(ids) == sorted(await question_db.get_active_question_ids())
@@ -0,0 +1,80 @@
+import asyncio
+import random
+
+from service.caches import Ranking, ScoreRanks
+from service.db_watchers import GameDb
+from service.utils import GameManager
+
+
+def brute_rank(scores: dict[int, int], score: int) -> int:
+    return 1 + sum(other > score for other in scores.values())
+
+
+def test_ranking_matches_sorting():
+    rng = random.Random(7)
+    scores = {tg_id: rng.randint(0, 20) for tg_id in range(200)}
+    ranking = Ranking(scores.items())
+    for _ in range(2000):
+        tg_id = rng.randrange(250)
+        scores[tg_id] = rng.randint(-5, 40)
+        ranking.set(tg_id, scores[tg_id])
+    assert len(ranking) == len(scores)
+    for tg_id, score in scores.items():
+        assert ranking.rank(tg_id) == (brute_rank(scores, score), score)
+    for score in range(-6, 42):
+        assert ranking.rank_of_score(score) == brute_rank(scores, score)
+    assert ranking.rank(1000) is None
+
+
+async def test_ranks_change_only_on_commit(session):
+    game = GameDb(session)
+    for tg_id in (1, 2):
+        await game.create_player(tg_id)
+    await session.commit()
+    manager = GameManager(session)
+    assert (await manager.player_rank(2)).rank == 1
+
+    await game.raise_score(2, 5)
+    assert (await manager.player_rank(1)).rank == 1
+    await session.rollback()
+    assert (await manager.player_rank(1)).rank == 1
+
+    await game.raise_score(2, 5)
+    await session.commit()
+    assert (await manager.player_rank(1)).rank == 2
+    assert (await manager.player_rank(2)).score == 5
+
+
+async def test_stale_ranks_reload_in_background():
+    ranks = ScoreRanks(ttl=0)
+    table = {1: 10, 2: 20}
+    reloading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def loader():
+        scores = list(table.items())
+        reloading.set()
+        await release.wait()
+        return scores
+
+    release.set()
+    await ranks.load(loader)
+    assert ranks.rank(1) == (2, 10)
+
+    release.clear()
+    reloading.clear()
+    table[3] = 30
+    await ranks.load(loader)
+    await reloading.wait()
+    # the old ranking serves while the table is read
+    assert len(ranks) == 2
+    ranks.set(1, 40)
+    assert ranks.rank(1) == (1, 40)
+
+    reload = ranks._task
+    release.set()
+    await reload
+    assert len(ranks) == 3
+    # the change made during the reload is not lost
+    assert ranks.rank(1) == (1, 40)
+    assert ranks.rank(3) == (2, 30)
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest_asyncio
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from service.db_setup.models import Base
+from service.db_watchers import GameDb
+
+INCREMENTS = 1000
+
+
+@pytest_asyncio.fixture
+async def racing_sessions(db, tmp_path):
+    """Sessions on connections of their own, a pool of them. The
+    in-memory database has a single connection the sessions take turns
+    on, so its increments never interleave: a sqlite file is used
+    instead, or TEST_DB_URL's server database as it is.
+    """
+    if make_url(db.uri).get_backend_name() != "sqlite":
+        yield db.session_maker
+        return
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'scores.db'}?timeout=60",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=5,
+        max_overflow=0,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        # readers do not wait for the writer, only writers take turns
+        await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    yield async_sessionmaker(engine, class_=AsyncSession)
+    await engine.dispose()
+
+
+async def test_parallel_increments_add_up(racing_sessions):
+    """Each increment in its own transaction, up to a pool of them at
+    once: a read, then a write of the score read loses increments.
+    """
+    async with racing_sessions() as session:
+        for tg_id in (1, 2, 3):
+            await GameDb(session).create_player(tg_id)
+        await session.commit()
+
+    async def increment(n: int) -> None:
+        async with racing_sessions() as own:
+            if n % 2:
+                await GameDb(own).raise_score(1)
+            else:
+                # CASE over several players in one UPDATE
+                await GameDb(own).raise_scores([(2, 1), (3, 2), (2, 1)])
+            await own.commit()
+
+    await asyncio.gather(*(increment(n) for n in range(INCREMENTS)))
+
+    async with racing_sessions() as session:
+        game = GameDb(session)
+        assert await game.get_score_of_player(1) == INCREMENTS // 2
+        assert await game.get_score_of_player(2) == INCREMENTS
+        assert await game.get_score_of_player(3) == INCREMENTS
+
+
+async def test_raise_scores_returns_new_scores(session):
+    game = GameDb(session)
+    for tg_id in (1, 2):
+        await game.create_player(tg_id)
+    assert await game.raise_scores([(1, 3), (2, -1), (9, 5)]) == {1: 3, 2: -1}
+    assert await game.raise_scores([(1, 2), (1, 2)]) == {1: 7}
+    assert await game.raise_scores([]) == {}
+    assert await game.raise_score(9) is None
@@ -0,0 +1,116 @@
+from service.statement_budget import assert_max_statements, assert_route_budget
+
+QUESTIONS = [
+    {
+        "text": f"q{n}",
+        "answers": [
+            {"text": "right", "correct": True},
+            {"text": "wrong", "correct": False},
+        ],
+    }
+    for n in range(2)
+]
+
+
+async def test_data_routes_within_budget(client):
+    # sqlite has no ordered multi-row RETURNING: one insert per question
+    await assert_route_budget(
+        client, "POST", "/v1/questions/import", json=QUESTIONS[:1]
+    )
+    await client.post("/v1/questions/import", json=QUESTIONS[1:])
+    response = await assert_route_budget(
+        client, "POST", "/v1/question", json={"text": "q2"}
+    )
+    question_id = response.json()["created"]
+    response = await assert_route_budget(
+        client,
+        "POST",
+        "/v1/answer",
+        json={"text": "a", "correct": True, "question_id": question_id},
+    )
+    answer_id = response.json()["created"]
+    for method, url, kwargs in (
+        ("GET", "/v1/quiz", {}),
+        ("GET", "/v1/quiz/export", {}),
+        ("GET", "/v1/questions", {}),
+        ("POST", "/v1/questions/batch", {"json": {"ids": [1, 2]}}),
+        ("GET", "/v1/question/1/stats", {}),
+        ("PATCH", f"/v1/question/{question_id}", {"params": {"text": "y"}}),
+        (
+            "POST",
+            "/v1/submit-answer",
+            {"params": {"question_id": 1}, "json": [1]},
+        ),
+        ("GET", f"/v1/answer/{answer_id}", {}),
+        ("DELETE", f"/v1/answer/{answer_id}", {}),
+        ("DELETE", f"/v1/question/{question_id}", {}),
+        ("PUT", "/tg-update-id", {"json": {"update_id": 1}}),
+        ("GET", "/tg-update-id", {}),
+    ):
+        response = await assert_route_budget(client, method, url, **kwargs)
+        assert response.status_code < 400, f"{method} {url}"
+
+
+async def test_game_routes_within_budget(client):
+    await client.post("/v1/questions/import", json=QUESTIONS)
+    for tg_id in (1, 2):
+        await assert_route_budget(
+            client, "POST", "/v1/player", params={"tg_id": tg_id}
+        )
+    # cold id pool, then a refill and a new cycle in turns
+    await assert_route_budget(
+        client, "POST", "/v1/round-question-id", json={"tg_id": 1}
+    )
+    await assert_route_budget(
+        client, "POST", "/v1/round-question", json={"tg_id": 2}
+    )
+    for question_id in (1, 2, 1, 2):
+        response = await assert_route_budget(
+            client,
+            "POST",
+            "/v1/turn",
+            json={"tg_id": 1, "question_id": question_id, "answer_ids": [1]},
+        )
+        assert response.status_code == 200
+    for method, url, kwargs in (
+        ("PUT", "/v1/mark-answered", {"json": {"tg_id": 2, "question_id": 1}}),
+        ("PUT", "/v1/edit-score", {"params": {"tg_id": 1, "delta": 2}}),
+        ("PUT", "/v1/edit-scores", {"json": {"items": [{"tg_id": 2}]}}),
+        ("GET", "/v1/player-score", {"params": {"tg_id": 1}}),
+        ("GET", "/v1/player-rank", {"params": {"tg_id": 1}}),
+        ("GET", "/v1/leaderboard", {}),
+    ):
+        response = await assert_route_budget(client, method, url, **kwargs)
+        assert response.status_code == 200, f"{method} {url}"
+
+
+async def test_steady_state_statements(client):
+    """Warm caches and filled rounds: what most requests run."""
+    await client.post("/v1/questions/import", json=QUESTIONS)
+    await client.post("/v1/player", params={"tg_id": 1})
+    response = await client.post("/v1/round-question-id", json={"tg_id": 1})
+    question_id = response.json()["question_id"]
+    response = await client.get("/v1/quiz")
+
+    with assert_max_statements(1):
+        await client.post("/v1/round-question-id", json={"tg_id": 1})
+    with assert_max_statements(3):
+        await client.post("/v1/round-question", json={"tg_id": 1})
+    with assert_max_statements(2):
+        await client.get("/v1/quiz")
+    with assert_max_statements(0):
+        await client.get(
+            "/v1/quiz", headers={"if-none-match": response.headers["etag"]}
+        )
+    submit = {"params": {"question_id": question_id}, "json": [1]}
+    await client.post("/v1/submit-answer", **submit)
+    with assert_max_statements(0):
+        await client.post("/v1/submit-answer", **submit)
+    with assert_max_statements(5):
+        await client.post(
+            "/v1/turn",
+            json={"tg_id": 1, "question_id": question_id, "answer_ids": [1]},
+        )
+    await client.get("/v1/player-rank", params={"tg_id": 1})
+    with assert_max_statements(0):
+        await client.get("/v1/player-rank", params={"tg_id": 1})
@@ -0,0 +1,25 @@
+import pytest
+
+from service import utils
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+async def test_update_id_never_moves_back(client, monkeypatch, in_memory):
+    monkeypatch.setattr(utils, "UPDATE_ID_IN_MEMORY", in_memory)
+    for update_id in (5, 9, 7):
+        response = await client.put(
+            "/tg-update-id", json={"update_id": update_id}
+        )
+        assert response.status_code == 200
+    response = await client.get("/tg-update-id")
+    assert response.json() == {"update_id": 9}
+
+
+async def test_workers_share_update_id_in_table(client, monkeypatch):
+    monkeypatch.setattr(utils, "UPDATE_ID_IN_MEMORY", False)
+    await client.put("/tg-update-id", json={"update_id": 11})
+    # another worker: its own mark in memory knows nothing of 11
+    utils.update_id_mark.advance(3)
+    assert await utils.load_tg_update_id() == 11
+    response = await client.get("/tg-update-id")
+    assert response.json() == {"update_id": 11}
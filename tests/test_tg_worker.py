@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import httpx
+from sqlalchemy.exc import OperationalError
+
+from service import tg_worker
+from service.caches import update_id_mark
+from service.db_watchers import GameDb
+from service.tg_worker import TgWorker
+from service.utils import save_tg_update_id
+
+SLOW_CHAT = 1
+
+
+class FakeBotApi:
+    """Serves scripted updates; replies to SLOW_CHAT wait for `release`."""
+
+    def __init__(self, db, updates: list[tuple[int, str]]) -> None:
+        self.db = db
+        self.updates = [
+            {
+                "update_id": update_id,
+                "message": {
+                    "from": {"id": tg_id},
+                    "chat": {"id": tg_id},
+                    "text": text,
+                },
+            }
+            for update_id, (tg_id, text) in enumerate(updates, start=1)
+        ]
+        self.replies: list[tuple[int, str]] = []
+        # chat -> whether its player was committed when /start was answered
+        self.committed: dict[int, bool] = {}
+        self.replied = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        method = request.url.path.rsplit("/", 1)[-1]
+        params = json.loads(request.content)
+        if method == "getUpdates":
+            offset = params.get("offset") or 0
+            result = [u for u in self.updates if u["update_id"] >= offset]
+            if not result:
+                await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"ok": True, "result": result})
+        chat_id = params["chat_id"]
+        if chat_id == SLOW_CHAT:
+            await self.release.wait()
+        if params["text"].startswith("Send /question"):
+            async with self.db.session_maker() as session:
+                score = await GameDb(session).get_score_of_player(chat_id)
+            self.committed[chat_id] = score is not None
+        self.replies.append((chat_id, params["text"]))
+        self.replied.set()
+        return httpx.Response(200, json={"ok": True, "result": {}})
+
+    async def wait_replies(self, count: int) -> None:
+        async with asyncio.timeout(5):
+            while len(self.replies) < count:
+                self.replied.clear()
+                await self.replied.wait()
+
+
+async def test_worker_replies_after_commit_in_order(db):
+    api = FakeBotApi(
+        db,
+        [
+            (1, "/start"),
+            (2, "/start"),
+            (1, "/score"),
+            (3, "/start"),
+            (2, "/score"),
+        ],
+    )
+    worker = TgWorker(
+        api_url="http://bot", handlers=4, transport=httpx.MockTransport(api)
+    )
+    worker.start()
+    try:
+        await api.wait_replies(3)
+        # update 1 is not handled yet, so the offset has not moved
+        assert update_id_mark.value is None
+        assert all(chat_id != SLOW_CHAT for chat_id, _ in api.replies)
+
+        api.release.set()
+        await api.wait_replies(5)
+        await asyncio.gather(*(queue.join() for queue in worker.queues))
+        assert update_id_mark.value == 5
+    finally:
+        await worker.stop()
+        await update_id_mark.stop(save_tg_update_id)
+
+    assert len(api.replies) == 5
+    assert api.committed == {1: True, 2: True, 3: True}
+    for tg_id in (1, 2):
+        texts = [text for chat_id, text in api.replies if chat_id == tg_id]
+        assert texts == ["Send /question to play", "Score: 0"]
+
+
+async def test_failed_update_is_not_confirmed(db, monkeypatch):
+    monkeypatch.setattr(tg_worker, "HANDLE_RETRY_DELAY", 0.01)
+    api = FakeBotApi(db, [(2, "/start"), (3, "/start"), (4, "/start")])
+    api.release.set()
+    worker = TgWorker(
+        api_url="http://bot", handlers=4, transport=httpx.MockTransport(api)
+    )
+    failures = []
+    retried = asyncio.Event()
+    recovered = asyncio.Event()
+    handle = worker.handle
+
+    async def flaky_handle(session, update):
+        chat_id = update["message"]["chat"]["id"]
+        if chat_id == 2 and not recovered.is_set():
+            failures.append(update["update_id"])
+            if len(failures) == 3:
+                retried.set()
+            raise OperationalError("COMMIT", {}, Exception("connection lost"))
+        if chat_id == 4:
+            raise ValueError("no handler for it")
+        return await handle(session, update)
+
+    monkeypatch.setattr(worker, "handle", flaky_handle)
+    worker.start()
+    try:
+        await api.wait_replies(1)
+        async with asyncio.timeout(5):
+            await retried.wait()
+        # updates 2 and 3 are done, but not update 1 before them
+        assert update_id_mark.value is None
+        assert api.replies == [(3, "Send /question to play")]
+
+        recovered.set()
+        await api.wait_replies(2)
+        await asyncio.gather(*(queue.join() for queue in worker.queues))
+        # update 1 handled on a retry, update 3 failed for good
+        assert update_id_mark.value == 3
+    finally:
+        await worker.stop()
+        await update_id_mark.stop(save_tg_update_id)
+
+    assert api.committed == {2: True, 3: True}